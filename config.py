@@ -5,6 +5,7 @@
 """
 
 import os
+import types
 from dotenv import load_dotenv
 
 # 加载.env文件
@@ -19,13 +20,16 @@ USE_PROXY = os.getenv('USE_PROXY', 'false').lower() in ('true', '1', 'yes')
 if not WEBHOOK_URL:
     print("警告: 未设置 WEBHOOK_URL 环境变量，webhook功能将无法使用")
 
+# webhook配置只在导入时构建一次，以只读映射共享给所有调用方
+_WEBHOOK_CONFIG = types.MappingProxyType({
+    'webhook_url': WEBHOOK_URL,
+    'proxy_url': PROXY_URL,
+    'use_proxy': USE_PROXY
+})
+
 def get_webhook_config():
-    """获取webhook配置信息"""
-    return {
-        'webhook_url': WEBHOOK_URL,
-        'proxy_url': PROXY_URL,
-        'use_proxy': USE_PROXY
-    }
+    """获取webhook配置信息 (只读，需要修改时请使用 dict(get_webhook_config()))"""
+    return _WEBHOOK_CONFIG
 
 def validate_config():
     """验证配置是否完整"""
@@ -3,13 +3,131 @@
 查找LP池工具 - 通过PancakeSwap V3 Factory查找MCH/WBNB池
 """
 
-from web3 import Web3
-import requests
-import json
+# web3/requests导入较慢，只在实际用到的函数内导入，保证模块本身可以快速加载
+import asyncio
+import sys
+import shelve
+import atexit
+
+# orjson解析更快，未安装时退回标准库 (两者的loads都可以直接接受bytes)
+try:
+    import orjson
+except ImportError:
+    import json as orjson
+
+# BSC RPC节点
+BSC_RPC_URL = 'https://bsc-dataseed1.binance.org/'
+
+# 代币元数据缓存文件 (symbol/decimals 不可变，跨运行持久化)
+TOKEN_META_DB = '.token_meta.db'
+
+# Multicall3合约地址 (BSC上已部署)
+MULTICALL3_ADDRESS = "0xcA11bde05977b3631167028862bE2a173976CA11"
+
+# 预先计算的函数选择器 (keccak256(函数签名)的前4字节)，直接构造eth_call数据，无需合约对象
+SEL_SYMBOL = bytes.fromhex('95d89b41')       # symbol()
+SEL_DECIMALS = bytes.fromhex('313ce567')     # decimals()
+SEL_BALANCEOF = bytes.fromhex('70a08231')    # balanceOf(address)
+SEL_TOKEN0 = bytes.fromhex('0dfe1681')       # token0()
+SEL_TOKEN1 = bytes.fromhex('d21220a7')       # token1()
+SEL_LIQUIDITY = bytes.fromhex('1a686502')    # liquidity()
+SEL_GETPOOL = bytes.fromhex('1698ee82')      # getPool(address,address,uint24)
+SEL_GETPAIR = bytes.fromhex('e6a43905')      # getPair(address,address)
+SEL_GETRESERVES = bytes.fromhex('0902f1ac')  # getReserves()
+SEL_AGGREGATE3 = bytes.fromhex('82ad56cb')   # aggregate3((address,bool,bytes)[])
+
+# 代币精度对应的缩放因子，避免每次计算 10 ** decimals (覆盖0-30位精度)
+SCALE = {d: 10 ** d for d in range(31)}
+
+def fmt(x, _f=format):
+    """格式化代币数量 (千分位，6位小数)"""
+    return _f(x, ',.6f')
+
+def eth_call(w3, to, data):
+    """直接发送eth_call，返回原始返回数据(bytes)"""
+    return bytes(w3.eth.call({'to': to, 'data': data}))
+
+_token_meta = None
+
+def get_token_meta_cache():
+    """获取持久化的代币元数据缓存，键为 "地址:字段" """
+    global _token_meta
+    if _token_meta is None:
+        _token_meta = shelve.open(TOKEN_META_DB)
+        atexit.register(_token_meta.close)
+    return _token_meta
+
+def create_session():
+    """创建带连接池的HTTP会话，所有RPC调用复用keep-alive连接"""
+    import requests
+    from requests.adapters import HTTPAdapter
+    
+    session = requests.Session()
+    session.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=3))
+    # DexScreener等API支持gzip压缩，可减少一半以上的传输量 (requests会自动解压)
+    session.headers.update({'Accept-Encoding': 'gzip, deflate', 'User-Agent': 'pcs-lp-monitor/1.0'})
+    return session
+
+_http_session = None
+
+def get_http_session():
+    """获取模块级共享HTTP会话，RPC和第三方API请求复用连接"""
+    global _http_session
+    if _http_session is None:
+        _http_session = create_session()
+    return _http_session
+
+def multicall3(w3, calls, allow_failure=False):
+    """通过Multicall3在一次eth_call中执行多个只读调用
+    
+    Args:
+        w3 (Web3): Web3实例
+        calls (list): [(target, calldata), ...] 调用列表，calldata为bytes
+        allow_failure (bool): 为True时单个调用失败不影响其它调用，失败的位置返回None
+        
+    Returns:
+        list: 每个调用的原始返回数据(bytes)，顺序与calls一致
+    """
+    from eth_abi import decode, encode
+    
+    data = SEL_AGGREGATE3 + encode(['(address,bool,bytes)[]'],
+                                   [[(target, allow_failure, calldata) for target, calldata in calls]])
+    results = decode(['(bool,bytes)[]'], eth_call(w3, MULTICALL3_ADDRESS, data))[0]
+    return [return_data if success else None for success, return_data in results]
+
+async def get_pools_async(factory_address, combos):
+    """并发查询getPool，用于不支持JSON-RPC批量请求的节点
+    
+    Args:
+        factory_address (str): V3 Factory地址
+        combos (list): [(tokenA, tokenB, fee, fee_str, order), ...] 查询组合
+        
+    Returns:
+        list: 与combos顺序一致的池地址，查询失败的位置为异常对象
+    """
+    from web3 import AsyncWeb3, AsyncHTTPProvider
+    from eth_abi import decode, encode
+    
+    w3 = AsyncWeb3(AsyncHTTPProvider(BSC_RPC_URL))
+    
+    async def get_pool(token0, token1, fee):
+        data = SEL_GETPOOL + encode(['address', 'address', 'uint24'], [token0, token1, fee])
+        result = await w3.eth.call({'to': factory_address, 'data': data})
+        return decode(['address'], bytes(result))[0]
+    
+    tasks = [get_pool(token0, token1, fee) for token0, token1, fee, _, _ in combos]
+    try:
+        return await asyncio.gather(*tasks, return_exceptions=True)
+    finally:
+        await w3.provider.disconnect()
 
 def find_v3_pools():
     """通过PancakeSwap V3 Factory查找MCH/WBNB池"""
-    w3 = Web3(Web3.HTTPProvider('https://bsc-dataseed1.binance.org/'))
+    from web3 import Web3
+    from eth_abi import decode, encode
+    
+    session = get_http_session()
+    w3 = Web3(Web3.HTTPProvider(BSC_RPC_URL, session=session, request_kwargs={'timeout': 10}))
     
     if not w3.is_connected():
         print("❌ 无法连接到BSC网络")
@@ -22,23 +140,6 @@ def find_v3_pools():
     mch_address = "0xF8F331DFa811132c43C308757CD802ca982b7211"
     wbnb_address = "0xbb4CdB9CBd36B01bD1cBaEBF2De08d9173bc095c"
     
-    # V3 Factory ABI (只需要getPool方法)
-    factory_abi = [
-        {
-            "inputs": [
-                {"internalType": "address", "name": "tokenA", "type": "address"},
-                {"internalType": "address", "name": "tokenB", "type": "address"},
-                {"internalType": "uint24", "name": "fee", "type": "uint24"}
-            ],
-            "name": "getPool",
-            "outputs": [{"internalType": "address", "name": "pool", "type": "address"}],
-            "stateMutability": "view",
-            "type": "function"
-        }
-    ]
-    
-    factory_contract = w3.eth.contract(address=factory_address, abi=factory_abi)
-    
     # 常见的手续费等级 (以basis points为单位)
     fee_tiers = [
         (100, "0.01%"),
@@ -55,30 +156,70 @@ def find_v3_pools():
     
     found_pools = []
     
-    for fee, fee_str in fee_tiers:
-        try:
-            # 尝试两种代币顺序
-            for token0, token1, order in [(mch_address, wbnb_address, "MCH/WBNB"), 
-                                        (wbnb_address, mch_address, "WBNB/MCH")]:
-                
-                pool_address = factory_contract.functions.getPool(token0, token1, fee).call()
-                
-                if pool_address != "0x0000000000000000000000000000000000000000":
-                    print(f"✅ 找到池 ({order} - {fee_str}): {pool_address}")
-                    found_pools.append({
-                        'address': pool_address,
-                        'token0': token0,
-                        'token1': token1,
-                        'fee': fee,
-                        'fee_str': fee_str,
-                        'order': order
-                    })
-                    
-                    # 检查这个池的详细信息
-                    check_pool_details(w3, pool_address, order, fee_str)
-                    
-        except Exception as e:
-            print(f"❌ 检查费率 {fee_str} 失败: {e}")
+    # V3的getPool与代币顺序无关，按地址排序后每个费率只需查询一次
+    # 排序后的顺序即池中实际的 token0/token1 顺序
+    token_names = {mch_address.lower(): "MCH", wbnb_address.lower(): "WBNB"}
+    token0, token1 = sorted([mch_address.lower(), wbnb_address.lower()])
+    order = f"{token_names[token0]}/{token_names[token1]}"
+    token0, token1 = Web3.to_checksum_address(token0), Web3.to_checksum_address(token1)
+    
+    # 预先生成所有 (tokenA, tokenB, fee) 组合
+    combos = [(token0, token1, fee, fee_str, order) for fee, fee_str in fee_tiers]
+    
+    # 将所有getPool调用打包成一个JSON-RPC批量请求，只需一次网络往返
+    batch = [
+        {
+            "jsonrpc": "2.0",
+            "id": i,
+            "method": "eth_call",
+            "params": [
+                {"to": factory_address, "data": '0x' + (SEL_GETPOOL + encode(['address', 'address', 'uint24'], [token0, token1, fee])).hex()},
+                "latest"
+            ]
+        }
+        for i, (token0, token1, fee, _, _) in enumerate(combos)
+    ]
+    
+    try:
+        response = session.post(BSC_RPC_URL, data=orjson.dumps(batch),
+                                headers={'Content-Type': 'application/json'}, timeout=30)
+        response.raise_for_status()
+        # 批量响应不保证顺序，按id对应回请求
+        results = {r.get('id'): r for r in orjson.loads(response.content)}
+        pool_results = []
+        for i in range(len(combos)):
+            result = results.get(i, {})
+            if 'result' in result:
+                pool_results.append(decode(['address'], bytes.fromhex(result['result'][2:]))[0])
+            else:
+                pool_results.append(Exception(result.get('error', '无返回结果')))
+    except Exception as e:
+        # 节点不支持批量请求时，退回到并发的单个请求
+        print(f"⚠️  批量查询getPool失败 ({e})，改为并发请求")
+        pool_results = asyncio.run(get_pools_async(factory_address, combos))
+    
+    for (token0, token1, fee, fee_str, order), pool_address in zip(combos, pool_results):
+        if isinstance(pool_address, Exception):
+            print(f"❌ 检查费率 {fee_str} ({order}) 失败: {pool_address}")
+            continue
+        
+        pool_address = Web3.to_checksum_address(pool_address)
+        
+        if int(pool_address, 16):
+            found_pools.append({
+                'address': pool_address,
+                'token0': token0,
+                'token1': token1,
+                'fee': fee,
+                'fee_str': fee_str,
+                'order': order
+            })
+    
+    # 所有池的详情合并查询，按发现顺序输出
+    details = get_pools_details(w3, [pool['address'] for pool in found_pools]) if found_pools else []
+    for pool, detail in zip(found_pools, details):
+        print(f"✅ 找到池 ({pool['order']} - {pool['fee_str']}): {pool['address']}")
+        sys.stdout.write(detail)
     
     if not found_pools:
         print("❌ 没有找到任何MCH/WBNB V3池")
@@ -90,91 +231,128 @@ def find_v3_pools():
 
 def check_pool_details(w3, pool_address, order, fee_str):
     """检查池的详细信息"""
-    try:
-        # V3池基本ABI
-        v3_abi = [
-            {"inputs": [], "name": "liquidity", "outputs": [{"internalType": "uint128", "name": "", "type": "uint128"}], "stateMutability": "view", "type": "function"},
-            {"inputs": [], "name": "token0", "outputs": [{"internalType": "address", "name": "", "type": "address"}], "stateMutability": "view", "type": "function"},
-            {"inputs": [], "name": "token1", "outputs": [{"internalType": "address", "name": "", "type": "address"}], "stateMutability": "view", "type": "function"}
-        ]
+    sys.stdout.write(get_pool_details(w3, pool_address))
+
+def get_pool_details(w3, pool_address):
+    """获取池的详细信息，返回格式化好的输出文本"""
+    return get_pools_details(w3, [pool_address])[0]
+
+def get_pools_details(w3, pool_addresses):
+    """批量获取多个池的详细信息，无论多少个池都只需两次Multicall3调用
+    
+    Args:
+        w3 (Web3): Web3实例
+        pool_addresses (list): 池地址列表
         
-        pool_contract = w3.eth.contract(address=pool_address, abi=v3_abi)
-        liquidity = pool_contract.functions.liquidity().call()
-        token0 = pool_contract.functions.token0().call()
-        token1 = pool_contract.functions.token1().call()
+    Returns:
+        list: 每个池格式化好的输出文本，顺序与pool_addresses一致
+    """
+    from web3 import Web3
+    from eth_abi import decode, encode
+    
+    # 先收集所有输出行，最后一次性输出
+    outs = [[] for _ in pool_addresses]
+    pool_tokens = [None] * len(pool_addresses)
+    try:
+        # 第一轮multicall: 获取所有池的流动性和代币地址
+        results = multicall3(w3, [
+            (pool_address, selector)
+            for pool_address in pool_addresses
+            for selector in (SEL_LIQUIDITY, SEL_TOKEN0, SEL_TOKEN1)
+        ], allow_failure=True)
         
-        print(f"   流动性: {liquidity}")
-        print(f"   Token0: {token0}")
-        print(f"   Token1: {token1}")
+        for i, out in enumerate(outs):
+            liquidity_data, token0_data, token1_data = results[3 * i:3 * i + 3]
+            if liquidity_data is None or token0_data is None or token1_data is None:
+                out.append("   ❌ 获取池详情失败: 池合约调用失败\n")
+                continue
+            liquidity = decode(['uint128'], liquidity_data)[0]
+            token0 = Web3.to_checksum_address(decode(['address'], token0_data)[0])
+            token1 = Web3.to_checksum_address(decode(['address'], token1_data)[0])
+            pool_tokens[i] = (token0, token1)
+            
+            out.append(f"   流动性: {liquidity}\n")
+            out.append(f"   Token0: {token0}\n")
+            out.append(f"   Token1: {token1}\n")
         
         # 检查代币余额
-        erc20_abi = [
-            {"inputs": [{"internalType": "address", "name": "account", "type": "address"}], "name": "balanceOf", "outputs": [{"internalType": "uint256", "name": "", "type": "uint256"}], "stateMutability": "view", "type": "function"},
-            {"inputs": [], "name": "symbol", "outputs": [{"internalType": "string", "name": "", "type": "string"}], "stateMutability": "view", "type": "function"},
-            {"inputs": [], "name": "decimals", "outputs": [{"internalType": "uint8", "name": "", "type": "uint8"}], "stateMutability": "view", "type": "function"}
-        ]
+        # 第二轮multicall: 获取所有池两个代币的balanceOf，以及缓存中没有的symbol/decimals (多个池共用的代币只查一次)
+        token_meta = get_token_meta_cache()
+        calls = []
+        meta_keys = []
+        for tokens in pool_tokens:
+            for token in tokens or ():
+                for field, selector, abi_type in (('symbol', SEL_SYMBOL, 'string'), ('decimals', SEL_DECIMALS, 'uint8')):
+                    key = f'{token}:{field}'
+                    if key not in token_meta and (key, abi_type) not in meta_keys:
+                        calls.append((token, selector))
+                        meta_keys.append((key, abi_type))
+        for pool_address, tokens in zip(pool_addresses, pool_tokens):
+            if tokens:
+                balance_data = SEL_BALANCEOF + encode(['address'], [pool_address])
+                calls.append((tokens[0], balance_data))
+                calls.append((tokens[1], balance_data))
         
-        token0_contract = w3.eth.contract(address=token0, abi=erc20_abi)
-        token1_contract = w3.eth.contract(address=token1, abi=erc20_abi)
+        results = multicall3(w3, calls, allow_failure=True) if calls else []
         
-        token0_symbol = token0_contract.functions.symbol().call()
-        token1_symbol = token1_contract.functions.symbol().call()
-        token0_decimals = token0_contract.functions.decimals().call()
-        token1_decimals = token1_contract.functions.decimals().call()
+        for (key, abi_type), data in zip(meta_keys, results):
+            if data is not None:
+                token_meta[key] = decode([abi_type], data)[0]
         
-        token0_balance = token0_contract.functions.balanceOf(pool_address).call()
-        token1_balance = token1_contract.functions.balanceOf(pool_address).call()
-        
-        token0_amount = token0_balance / (10 ** token0_decimals)
-        token1_amount = token1_balance / (10 ** token1_decimals)
-        
-        print(f"   {token0_symbol}: {token0_amount:,.6f}")
-        print(f"   {token1_symbol}: {token1_amount:,.6f}")
-        
-        if token0_amount > 0 and token1_amount > 0:
-            print("   ✅ 池中有流动性")
-        else:
-            print("   ⚠️  池中没有流动性")
+        balances = iter(results[len(meta_keys):])
+        for out, tokens in zip(outs, pool_tokens):
+            if not tokens:
+                continue
+            token0, token1 = tokens
+            token0_data, token1_data = next(balances), next(balances)
+            try:
+                token0_symbol = token_meta[f'{token0}:symbol']
+                token1_symbol = token_meta[f'{token1}:symbol']
+                token0_decimals = token_meta[f'{token0}:decimals']
+                token1_decimals = token_meta[f'{token1}:decimals']
+                if token0_data is None or token1_data is None:
+                    raise ValueError("balanceOf调用失败")
+                
+                # balanceOf 是可变数据，不缓存；保持原始整数，只在显示时换算
+                token0_balance = decode(['uint256'], token0_data)[0]
+                token1_balance = decode(['uint256'], token1_data)[0]
+                
+                token0_scale = SCALE[token0_decimals] if token0_decimals in SCALE else 10 ** token0_decimals
+                token1_scale = SCALE[token1_decimals] if token1_decimals in SCALE else 10 ** token1_decimals
+                
+                out.append(f"   {token0_symbol}: {fmt(token0_balance / token0_scale)}\n")
+                out.append(f"   {token1_symbol}: {fmt(token1_balance / token1_scale)}\n")
+                
+                if token0_balance > 0 and token1_balance > 0:
+                    out.append("   ✅ 池中有流动性\n")
+                else:
+                    out.append("   ⚠️  池中没有流动性\n")
+            except Exception as e:
+                out.append(f"   ❌ 获取池详情失败: {e}\n")
             
     except Exception as e:
-        print(f"   ❌ 获取池详情失败: {e}")
+        for out in outs:
+            out.append(f"   ❌ 获取池详情失败: {e}\n")
     
-    print()
+    return [''.join(out) + "\n" for out in outs]
 
 def find_v2_pools(w3, mch_address, wbnb_address):
     """查找V2池"""
+    from web3 import Web3
+    from eth_abi import decode, encode
+    
     try:
         # PancakeSwap V2 Factory地址
         v2_factory_address = "0xcA143Ce32Fe78f1f7019d7d551a6402fC5350c73"
         
-        v2_factory_abi = [
-            {
-                "inputs": [
-                    {"internalType": "address", "name": "", "type": "address"},
-                    {"internalType": "address", "name": "", "type": "address"}
-                ],
-                "name": "getPair",
-                "outputs": [{"internalType": "address", "name": "", "type": "address"}],
-                "stateMutability": "view",
-                "type": "function"
-            }
-        ]
-        
-        factory_contract = w3.eth.contract(address=v2_factory_address, abi=v2_factory_abi)
-        pair_address = factory_contract.functions.getPair(mch_address, wbnb_address).call()
+        data = SEL_GETPAIR + encode(['address', 'address'], [mch_address, wbnb_address])
+        pair_address = Web3.to_checksum_address(decode(['address'], eth_call(w3, v2_factory_address, data))[0])
         
-        if pair_address != "0x0000000000000000000000000000000000000000":
+        if int(pair_address, 16):
             print(f"✅ 找到V2池: {pair_address}")
             
             # 检查V2池详情
-            v2_abi = [
-                {"inputs": [], "name": "getReserves", "outputs": [{"internalType": "uint112", "name": "_reserve0", "type": "uint112"}, {"internalType": "uint112", "name": "_reserve1", "type": "uint112"}, {"internalType": "uint32", "name": "_blockTimestampLast", "type": "uint32"}], "stateMutability": "view", "type": "function"},
-                {"inputs": [], "name": "token0", "outputs": [{"internalType": "address", "name": "", "type": "address"}], "stateMutability": "view", "type": "function"},
-                {"inputs": [], "name": "token1", "outputs": [{"internalType": "address", "name": "", "type": "address"}], "stateMutability": "view", "type": "function"}
-            ]
-            
-            pair_contract = w3.eth.contract(address=pair_address, abi=v2_abi)
-            reserves = pair_contract.functions.getReserves().call()
+            reserves = decode(['uint112', 'uint112', 'uint32'], eth_call(w3, pair_address, SEL_GETRESERVES))
             
             print(f"   Reserve0: {reserves[0]}")
             print(f"   Reserve1: {reserves[1]}")
@@ -195,10 +373,10 @@ def search_via_api():
     try:
         # DexScreener API
         url = f"https://api.dexscreener.com/latest/dex/tokens/{mch_address}"
-        response = requests.get(url, timeout=10)
+        response = get_http_session().get(url, timeout=10)
         
         if response.status_code == 200:
-            data = response.json()
+            data = orjson.loads(response.content)
             pairs = data.get('pairs', [])
             
             print(f"找到 {len(pairs)} 个交易对:")
@@ -220,4 +398,6 @@ if __name__ == "__main__":
     print("="*60)
     
     pools = find_v3_pools()
-    search_via_api()
+    # 链上已经找到池时不再请求第三方API
+    if not pools:
+        search_via_api()
@@ -4,24 +4,51 @@ Pancake LP池监控主程序
 监控指定LP池的TVL和代币数量变化
 """
 
-import json
+import orjson
+import sys
 import time
+from math import fabs
+from decimal import Decimal
 import os
 import csv
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
 from web3 import Web3
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, field, fields
+from operator import attrgetter
+from functools import lru_cache
 import logging
+from logging.handlers import QueueHandler, QueueListener
+from queue import Queue
 import requests
-from threading import Lock
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from threading import Lock, Thread
 import asyncio
-from webhook import send_message_async
+from itertools import islice
+from contextlib import ExitStack
+from concurrent.futures import ThreadPoolExecutor, wait as wait_futures
+from webhook import send_message_async, close_session
+from price_store import create_price_store
 
 
-@dataclass
+# Multicall3合约地址 (BSC等主流链上地址相同)
+MULTICALL3_ADDRESS = "0xcA11bde05977b3631167028862bE2a173976CA11"
+
+# DexScreener批量查询交易对接口单次最多支持的地址数
+DEXSCREENER_MAX_PAIRS = 30
+
+# 池储备量数据: (token0符号, token1符号, token0数量, token1数量, token0精度, token1精度, token0原始余额, token1原始余额)
+PoolReserves = Tuple[str, str, Decimal, Decimal, int, int, int, int]
+
+# 用于识别池类型的函数选择器: V3池有fee()，V2池有getReserves()
+V3_FEE_SELECTOR = bytes.fromhex("ddca3f43")
+V2_GET_RESERVES_SELECTOR = bytes.fromhex("0902f1ac")
+
+
+@dataclass(slots=True, frozen=True)
 class PoolData:
-    """LP池数据结构"""
+    """LP池数据结构 (export=False 的字段只在运行时使用，不写入数据文件)"""
     timestamp: str
     pool_address: str
     pool_name: str
@@ -35,41 +62,377 @@ class PoolData:
     target_token: str
     target_token_amount: float
     target_token_price: float
+    # TVL占比信息 (用于显示)
+    token0_tvl: float = field(default=0.0, metadata={'export': False})
+    token1_tvl: float = field(default=0.0, metadata={'export': False})
+    token0_percentage: float = field(default=0.0, metadata={'export': False})
+    token1_percentage: float = field(default=0.0, metadata={'export': False})
+    # 原始整数余额 (用于精确判断数量变化是否超过阈值，可能超出JSON的64位整数范围)
+    token0_raw: int = field(default=0, metadata={'export': False})
+    token1_raw: int = field(default=0, metadata={'export': False})
+    target_token_raw: int = field(default=0, metadata={'export': False})
+
+
+@dataclass
+class Deltas:
+    """相邻两轮之间的变化百分比"""
+    tvl_pct: float
+    target_pct: float
+    t0_amt_pct: float
+    t0_tvl_pct: float
+    t1_amt_pct: float
+    t1_tvl_pct: float
+
+
+# 按 int(变化 > 0) 取颜色: 0 -> 下跌, 1 -> 上涨
+_EMOJIS = ("🔴", "🟢")
+
+# 报警级别emoji: [超过阈值的倍数(0-3)][是否上涨]
+_ALERT_EMOJIS = (("ℹ️", "ℹ️"), ("🔻", "🔺"), ("⚠️", "📈"), ("🚨", "🎉"))
+
+# 变化百分比显示emoji: {(是否超过阈值, 是否上涨): emoji}，未超过阈值时显示白色
+_LEVEL_EMOJIS = {(False, False): "⚪", (False, True): "⚪", (True, False): "🔴", (True, True): "🟢"}
+
+
+def pct(current: float, previous: float) -> float:
+    """变化百分比，上一轮为0时按0处理，避免除零"""
+    return 0.0 if previous == 0 else (current - previous) / previous * 100.0
+
+
+def _compute_deltas(current: PoolData, prev: PoolData) -> Deltas:
+    """一次算出报警判断和webhook消息需要的全部变化百分比"""
+    return Deltas(
+        tvl_pct=pct(current.tvl_usd, prev.tvl_usd),
+        target_pct=pct(current.target_token_amount, prev.target_token_amount),
+        t0_amt_pct=pct(current.token0_amount, prev.token0_amount),
+        t0_tvl_pct=pct(current.token0_tvl, prev.token0_tvl),
+        t1_amt_pct=pct(current.token1_amount, prev.token1_amount),
+        t1_tvl_pct=pct(current.token1_tvl, prev.token1_tvl),
+    )
+
+
+# PancakeSwap V3池ABI
+_V3_POOL_ABI = [
+    {
+        "inputs": [],
+        "name": "token0",
+        "outputs": [{"internalType": "address", "name": "", "type": "address"}],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "inputs": [],
+        "name": "token1", 
+        "outputs": [{"internalType": "address", "name": "", "type": "address"}],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "inputs": [],
+        "name": "fee",
+        "outputs": [{"internalType": "uint24", "name": "", "type": "uint24"}],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "inputs": [],
+        "name": "liquidity",
+        "outputs": [{"internalType": "uint128", "name": "", "type": "uint128"}],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "inputs": [],
+        "name": "slot0",
+        "outputs": [
+            {"internalType": "uint160", "name": "sqrtPriceX96", "type": "uint160"},
+            {"internalType": "int24", "name": "tick", "type": "int24"},
+            {"internalType": "uint16", "name": "observationIndex", "type": "uint16"},
+            {"internalType": "uint16", "name": "observationCardinality", "type": "uint16"},
+            {"internalType": "uint16", "name": "observationCardinalityNext", "type": "uint16"},
+            {"internalType": "uint8", "name": "feeProtocol", "type": "uint8"},
+            {"internalType": "bool", "name": "unlocked", "type": "bool"}
+        ],
+        "stateMutability": "view",
+        "type": "function"
+    }
+]
+
+
+# PancakeSwap V2池ABI
+_V2_POOL_ABI = [
+    {
+        "inputs": [],
+        "name": "token0",
+        "outputs": [{"internalType": "address", "name": "", "type": "address"}],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "inputs": [],
+        "name": "token1", 
+        "outputs": [{"internalType": "address", "name": "", "type": "address"}],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "inputs": [],
+        "name": "getReserves",
+        "outputs": [
+            {"internalType": "uint112", "name": "_reserve0", "type": "uint112"},
+            {"internalType": "uint112", "name": "_reserve1", "type": "uint112"},
+            {"internalType": "uint32", "name": "_blockTimestampLast", "type": "uint32"}
+        ],
+        "stateMutability": "view",
+        "type": "function"
+    }
+]
+
+
+# ERC20代币的基本ABI
+_ERC20_ABI = [
+    {
+        "inputs": [],
+        "name": "symbol",
+        "outputs": [{"internalType": "string", "name": "", "type": "string"}],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "inputs": [],
+        "name": "decimals",
+        "outputs": [{"internalType": "uint8", "name": "", "type": "uint8"}],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "inputs": [{"internalType": "address", "name": "account", "type": "address"}],
+        "name": "balanceOf",
+        "outputs": [{"internalType": "uint256", "name": "", "type": "uint256"}],
+        "stateMutability": "view",
+        "type": "function"
+    }
+]
+
+
+# Multicall3合约ABI (只需要aggregate3方法)
+_MULTICALL3_ABI = [
+    {
+        "inputs": [
+            {
+                "components": [
+                    {"internalType": "address", "name": "target", "type": "address"},
+                    {"internalType": "bool", "name": "allowFailure", "type": "bool"},
+                    {"internalType": "bytes", "name": "callData", "type": "bytes"}
+                ],
+                "internalType": "struct Multicall3.Call3[]",
+                "name": "calls",
+                "type": "tuple[]"
+            }
+        ],
+        "name": "aggregate3",
+        "outputs": [
+            {
+                "components": [
+                    {"internalType": "bool", "name": "success", "type": "bool"},
+                    {"internalType": "bytes", "name": "returnData", "type": "bytes"}
+                ],
+                "internalType": "struct Multicall3.Result[]",
+                "name": "returnData",
+                "type": "tuple[]"
+            }
+        ],
+        "stateMutability": "payable",
+        "type": "function"
+    }
+]
+
+
+# checksum地址需要计算keccak256，池和代币地址每轮都会重复出现，缓存结果
+_checksum = lru_cache(maxsize=1024)(Web3.to_checksum_address)
+
+_ABIS = {
+    'v3_pool': _V3_POOL_ABI,
+    'v2_pool': _V2_POOL_ABI,
+    'erc20': _ERC20_ABI,
+    'multicall3': _MULTICALL3_ABI,
+}
+
+
+@lru_cache(maxsize=16)
+def _contract_factory(w3: Web3, kind: str):
+    """每种合约类型只解析一次ABI，生成可按地址实例化的合约类"""
+    return w3.eth.contract(abi=_ABIS[kind])
+
+
+@lru_cache(maxsize=512)
+def _build_contract(w3: Web3, address: str, kind: str):
+    """按地址和合约类型构建合约对象 (LRU缓存，同类型合约共用已解析ABI的合约类)"""
+    return _contract_factory(w3, kind)(address=_checksum(address))
+
+
+# 导出列名及对应的取值函数 (只计算一次，写入时不再逐行asdict)
+_FIELDS = tuple(f.name for f in fields(PoolData) if f.metadata.get('export', True))
+_GETTERS = tuple(attrgetter(name) for name in _FIELDS)
+
+
+class TokenBucket:
+    """令牌桶限速: 平均每秒 rate 个请求，最多连续突发 burst 个"""
+    
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated_at = time.monotonic()
+        self.lock = Lock()
+    
+    def consume(self) -> None:
+        """取一个令牌，令牌不足时等待补充"""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            wait = (1 - self.tokens) / self.rate if self.tokens < 1 else 0.0
+            self.tokens -= 1  # 可能为负，表示已预支的令牌，后来的调用者需要等待更久
+        if wait > 0:
+            time.sleep(wait)
+
+
+def load_data_file(path: str) -> List[Dict]:
+    """读取保存的历史数据，兼容JSONL和旧版JSON数组格式"""
+    with open(path, 'rb') as f:
+        if path.endswith('.json'):
+            return orjson.loads(f.read())
+        return [orjson.loads(line) for line in f if line.strip()]
+
+
+def to_json_array(jsonl_path: str, json_path: Optional[str] = None) -> str:
+    """把JSONL数据文件转换成JSON数组文件，供只能读取数组格式的工具使用，返回输出路径"""
+    if json_path is None:
+        base, ext = os.path.splitext(jsonl_path)
+        if ext == '.json':
+            raise ValueError(f"{jsonl_path} 已经是JSON数组文件，需要另外指定 json_path")
+        json_path = base + '.json'  # lp_data_YYYYMMDD.jsonl -> lp_data_YYYYMMDD.json
+    with open(json_path, 'wb') as f:
+        f.write(orjson.dumps(load_data_file(jsonl_path), option=orjson.OPT_INDENT_2))
+    return json_path
 
 
 class LPMonitor:
     def __init__(self, config_file: str = "config.json"):
         self.config_file = config_file
         self.config = self.load_config()
+        self.coingecko_mapping = self.build_coingecko_mapping()
+        self.dexscreener_pair_addresses = self.build_dexscreener_pair_addresses()
+        self.http = self.create_http_session()
         self.w3 = None
         self.setup_web3()
         self.setup_logging()
         self.setup_directories()
         self.previous_data: Dict[str, PoolData] = {}
         
+        # 代币元数据缓存 (symbol/decimals 不可变，永久缓存并持久化到磁盘)
+        self.token_meta_cache: Dict[str, Tuple[str, int]] = {}  # {checksum地址: (symbol, decimals)}
+        self.token_meta_lock = Lock()  # 多线程写缓存及落盘时加锁
+        self.load_token_meta_cache()
+        
         # 价格缓存系统
-        self.price_cache: Dict[str, Dict] = {}  # {symbol: {price: float, timestamp: datetime, source: str}}
-        self.price_cache_lock = Lock()  # 线程安全锁
         self.cache_ttl_minutes = self.config.get('price_cache', {}).get('ttl_minutes', 5)  # 缓存有效期5分钟
-        self.batch_request_symbols = set()  # 待批量请求的代币符号
+        self.price_store = create_price_store(self.config.get('price_cache', {}), self.logger)  # 内存或Redis后端
+        self.symbol_locks: Dict[str, Lock] = {}  # 按代币加锁，只在缓存未命中需要请求API时使用
+        
+        # 快过期的价格在后台提前刷新，监控循环继续使用仍有效的缓存
+        self.prefetch_executor = ThreadPoolExecutor(max_workers=1)
+        self.prefetch_future = None
+        
+        # CoinGecko请求限速，避免触发429后的长时间退避
+        coingecko_rate = self.config.get('api_settings', {}).get('coingecko_rate_per_minute', 10)
+        self.coingecko_bucket = TokenBucket(rate=coingecko_rate / 60, burst=coingecko_rate)
+        # 与DexScreener并发请求CoinGecko用的单线程池，整个生命周期复用
+        self.coingecko_executor = ThreadPoolExecutor(max_workers=1)
+        
+        # 报警消息在常驻的后台事件循环中发送，避免每次报警都新建事件循环
+        self.alert_loop = asyncio.new_event_loop()
+        Thread(target=self.alert_loop.run_forever, daemon=True).start()
+        self.pending_alerts = set()  # 尚未发送完成的报警，退出前等待它们结束
+        
+        # RPC批量请求分块较多时用于并发发送
+        self.rpc_executor = ThreadPoolExecutor(max_workers=4)
+        
+        # 各池并发计算用的线程池 (整个生命周期复用，线程按需创建)
+        enabled_count = sum(1 for pool in self.config.get('pools', []) if pool.get('enabled', True))
+        self.executor = ThreadPoolExecutor(max_workers=min(16, max(1, enabled_count)))
+        
+        # 池的代币地址缓存 (token0/token1 不会变化)
+        self.pool_tokens_cache: Dict[str, Tuple[str, str]] = {}  # {池地址: (token0地址, token1地址)}
+        self.load_pool_tokens_cache()
+        # 自动检测到的池类型 (包括unknown)，进程内只检测一次；v2/v3 保存到 data/pool_types.json
+        self.pool_type_cache: Dict[str, str] = {}
+        self.pool_types_dirty = False
+        self.load_pool_types_cache()
+        
+        # JSONL数据文件句柄跨轮次保持打开，日期变化时切换到新文件
+        self.jsonl_handle = None
+        self.jsonl_path: Optional[str] = None
+        self.csv_handle = None
+        self.csv_writer = None
+        self.csv_path: Optional[str] = None
+        self.last_status_key = None  # 上次打印状态表时的数据，未变化时不重绘
+        
+        # 数据文件由后台线程写入，磁盘慢时不拖慢监控循环 (队列有上限，积压过多时监控循环等待)
+        self.save_queue: Queue = Queue(maxsize=100)
+        self.save_thread = Thread(target=self.save_worker, daemon=True)
+        self.save_thread.start()
         
     def load_config(self) -> Dict:
         """加载配置文件"""
         try:
-            with open(self.config_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            with open(self.config_file, 'rb') as f:
+                config = orjson.loads(f.read())
         except FileNotFoundError:
             print(f"❌ 配置文件 {self.config_file} 不存在!")
             print("请先运行: python pool_manager.py add [池地址] --name [池名称]")
             exit(1)
-        except json.JSONDecodeError as e:
+        except orjson.JSONDecodeError as e:
             print(f"❌ 配置文件格式错误: {e}")
             exit(1)
+        
+        # 池地址预先转换为checksum格式，后续无需重复转换
+        for pool in config.get('pools', []):
+            try:
+                pool['contract_address'] = _checksum(pool['contract_address'])
+            except (KeyError, ValueError):
+                pass
+        return config
+    
+    def create_http_session(self) -> requests.Session:
+        """创建复用连接的HTTP会话 (keep-alive，避免每次请求重新TCP+TLS握手)"""
+        session = requests.Session()
+        # 429/5xx短退避重试；不按Retry-After等待，避免DexScreener/RPC限流时卡住整轮监控
+        adapter = HTTPAdapter(
+            pool_connections=8,
+            pool_maxsize=16,
+            max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=(429, 500, 502, 503, 504),
+                              respect_retry_after_header=False)
+        )
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        
+        # CoinGecko免费接口限流严格: 429时最多重试2次，退避依次为0秒和1秒 (不含请求本身耗时)
+        # 不按Retry-After等待: 其值可长达数分钟，会卡住整轮监控 (DexScreener的价格不受影响)
+        coingecko_adapter = HTTPAdapter(
+            max_retries=Retry(total=2, backoff_factor=0.5, status_forcelist=(429, 503),
+                              respect_retry_after_header=False)
+        )
+        session.mount('https://api.coingecko.com/', coingecko_adapter)
+        return session
     
     def setup_web3(self) -> None:
         """设置Web3连接"""
         try:
-            self.w3 = Web3(Web3.HTTPProvider(self.config['network']['rpc_url']))
+            # 每次eth_call的参数校验都会查询链ID，链ID不会变化，缓存后只请求一次
+            self.w3 = Web3(Web3.HTTPProvider(self.config['network']['rpc_url'], session=self.http,
+                                             cache_allowed_requests=True, cacheable_requests={'eth_chainId'}))
             if not self.w3.is_connected():
                 print(f"❌ 无法连接到网络: {self.config['network']['name']}")
                 exit(1)
@@ -79,24 +442,32 @@ class LPMonitor:
             exit(1)
     
     def setup_logging(self) -> None:
-        """设置日志"""
+        """设置日志
+        
+        监控线程只把日志记录放进队列，格式化和写文件/控制台由QueueListener的后台线程完成，
+        磁盘慢时不会拖慢监控循环
+        """
+        formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
         if self.config['output'].get('file_log', False):
             log_dir = self.config['output'].get('log_directory', './logs')
             os.makedirs(log_dir, exist_ok=True)
             
-            logging.basicConfig(
-                level=logging.INFO,
-                format='%(asctime)s - %(levelname)s - %(message)s',
-                handlers=[
-                    logging.FileHandler(f"{log_dir}/lp_monitor.log"),
-                    logging.StreamHandler() if self.config['output'].get('console_log', True) else logging.NullHandler()
-                ]
-            )
+            handlers = [logging.FileHandler(f"{log_dir}/lp_monitor.log", encoding='utf-8', delay=True)]
+            if self.config['output'].get('console_log', True):
+                handlers.append(logging.StreamHandler())
         else:
-            logging.basicConfig(
-                level=logging.INFO,
-                format='%(asctime)s - %(levelname)s - %(message)s'
-            )
+            handlers = [logging.StreamHandler()]
+        
+        for handler in handlers:
+            handler.setFormatter(formatter)
+        
+        # 队列里只放原始消息，格式在输出端的handler中统一处理
+        log_queue = Queue()
+        queue_handler = QueueHandler(log_queue)
+        queue_handler.setFormatter(logging.Formatter('%(message)s'))
+        logging.basicConfig(level=logging.INFO, handlers=[queue_handler])
+        self.log_listener = QueueListener(log_queue, *handlers)
+        self.log_listener.start()
         
         self.logger = logging.getLogger(__name__)
     
@@ -112,122 +483,196 @@ class LPMonitor:
         if 'price_cache' not in self.config:
             self.config['price_cache'] = {
                 'ttl_minutes': 5,  # 缓存有效期5分钟
+                'backend': 'memory',  # 缓存后端: memory 或 redis
                 'batch_threshold': 5,  # 批量请求阈值
                 'enable_stats': True  # 启用统计信息
             }
     
-    def get_v3_pool_abi(self) -> List[Dict]:
-        """获取PancakeSwap V3池的正确ABI"""
-        return [
-            {
-                "inputs": [],
-                "name": "token0",
-                "outputs": [{"internalType": "address", "name": "", "type": "address"}],
-                "stateMutability": "view",
-                "type": "function"
-            },
-            {
-                "inputs": [],
-                "name": "token1", 
-                "outputs": [{"internalType": "address", "name": "", "type": "address"}],
-                "stateMutability": "view",
-                "type": "function"
-            },
-            {
-                "inputs": [],
-                "name": "fee",
-                "outputs": [{"internalType": "uint24", "name": "", "type": "uint24"}],
-                "stateMutability": "view",
-                "type": "function"
-            },
-            {
-                "inputs": [],
-                "name": "liquidity",
-                "outputs": [{"internalType": "uint128", "name": "", "type": "uint128"}],
-                "stateMutability": "view",
-                "type": "function"
-            },
-            {
-                "inputs": [],
-                "name": "slot0",
-                "outputs": [
-                    {"internalType": "uint160", "name": "sqrtPriceX96", "type": "uint160"},
-                    {"internalType": "int24", "name": "tick", "type": "int24"},
-                    {"internalType": "uint16", "name": "observationIndex", "type": "uint16"},
-                    {"internalType": "uint16", "name": "observationCardinality", "type": "uint16"},
-                    {"internalType": "uint16", "name": "observationCardinalityNext", "type": "uint16"},
-                    {"internalType": "uint8", "name": "feeProtocol", "type": "uint8"},
-                    {"internalType": "bool", "name": "unlocked", "type": "bool"}
-                ],
-                "stateMutability": "view",
-                "type": "function"
-            }
-        ]
+    def get_token_meta_file(self) -> str:
+        """代币元数据缓存文件路径"""
+        data_dir = self.config['output'].get('data_directory', './data')
+        return f"{data_dir}/token_meta.json"
     
-    def get_v2_pool_abi(self) -> List[Dict]:
-        """获取PancakeSwap V2池的ABI"""
-        return [
-            {
-                "inputs": [],
-                "name": "token0",
-                "outputs": [{"internalType": "address", "name": "", "type": "address"}],
-                "stateMutability": "view",
-                "type": "function"
-            },
-            {
-                "inputs": [],
-                "name": "token1", 
-                "outputs": [{"internalType": "address", "name": "", "type": "address"}],
-                "stateMutability": "view",
-                "type": "function"
-            },
-            {
-                "inputs": [],
-                "name": "getReserves",
-                "outputs": [
-                    {"internalType": "uint112", "name": "_reserve0", "type": "uint112"},
-                    {"internalType": "uint112", "name": "_reserve1", "type": "uint112"},
-                    {"internalType": "uint32", "name": "_blockTimestampLast", "type": "uint32"}
-                ],
-                "stateMutability": "view",
-                "type": "function"
-            }
-        ]
+    def load_token_meta_cache(self) -> None:
+        """从磁盘和配置文件加载代币元数据缓存，重启后无需重新查询"""
+        try:
+            with open(self.get_token_meta_file(), 'rb') as f:
+                for address, (symbol, decimals) in orjson.loads(f.read()).items():
+                    self.token_meta_cache[_checksum(address)] = (symbol, int(decimals))
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            self.logger.warning(f"加载代币信息缓存失败: {e}")
+        
+        # 配置中已写明的代币信息 (pools[].token0/token1: {address, symbol, decimals})
+        for pool in self.config.get('pools', []):
+            for key in ('token0', 'token1'):
+                token = pool.get(key)
+                if isinstance(token, dict) and token.get('address') and 'symbol' in token and 'decimals' in token:
+                    self.token_meta_cache[_checksum(token['address'])] = (token['symbol'], int(token['decimals']))
     
-    def get_erc20_abi(self) -> List[Dict]:
-        """获取ERC20代币的基本ABI"""
-        return [
-            {
-                "inputs": [],
-                "name": "symbol",
-                "outputs": [{"internalType": "string", "name": "", "type": "string"}],
-                "stateMutability": "view",
-                "type": "function"
-            },
-            {
-                "inputs": [],
-                "name": "decimals",
-                "outputs": [{"internalType": "uint8", "name": "", "type": "uint8"}],
-                "stateMutability": "view",
-                "type": "function"
-            },
-            {
-                "inputs": [{"internalType": "address", "name": "account", "type": "address"}],
-                "name": "balanceOf",
-                "outputs": [{"internalType": "uint256", "name": "", "type": "uint256"}],
-                "stateMutability": "view",
-                "type": "function"
-            }
-        ]
+    def load_pool_tokens_cache(self) -> None:
+        """配置中写明了token0/token1地址的池直接填入缓存，第一轮也无需查询代币地址"""
+        for pool in self.config.get('pools', []):
+            token0, token1 = pool.get('token0'), pool.get('token1')
+            if isinstance(token0, dict) and isinstance(token1, dict) and token0.get('address') and token1.get('address'):
+                self.pool_tokens_cache[_checksum(pool['contract_address'])] = (
+                    _checksum(token0['address']), _checksum(token1['address'])
+                )
+    
+    def get_pool_types_file(self) -> str:
+        """自动检测到的池类型缓存文件路径"""
+        data_dir = self.config['output'].get('data_directory', './data')
+        return f"{data_dir}/pool_types.json"
+    
+    def load_pool_types_cache(self) -> None:
+        """加载之前自动检测到的池类型，重启后无需重新检测"""
+        try:
+            with open(self.get_pool_types_file(), 'rb') as f:
+                for address, pool_type in orjson.loads(f.read()).items():
+                    if pool_type in ('v2', 'v3'):
+                        self.pool_type_cache[_checksum(address)] = pool_type
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            self.logger.warning(f"加载池类型缓存失败: {e}")
+    
+    def save_pool_types_cache(self) -> None:
+        """有新检测到的池类型时写入文件 (只保存v2/v3，unknown下次启动重新检测)"""
+        if not self.pool_types_dirty:
+            return
+        self.pool_types_dirty = False
+        pool_types = {address: pool_type for address, pool_type in self.pool_type_cache.items() if pool_type in ('v2', 'v3')}
+        pool_types_file = self.get_pool_types_file()
+        tmp_file = f"{pool_types_file}.tmp"
+        try:
+            with open(tmp_file, 'wb') as f:
+                f.write(orjson.dumps(pool_types, option=orjson.OPT_INDENT_2))
+            os.replace(tmp_file, pool_types_file)
+        except Exception as e:
+            self.logger.warning(f"保存池类型缓存失败: {e}")
+    
+    def save_token_meta_cache(self) -> None:
+        """持久化代币元数据缓存 (先写临时文件再替换，避免写到一半的文件)"""
+        meta_file = self.get_token_meta_file()
+        tmp_file = f"{meta_file}.tmp"
+        try:
+            with self.token_meta_lock:
+                with open(tmp_file, 'wb') as f:
+                    f.write(orjson.dumps(self.token_meta_cache, option=orjson.OPT_INDENT_2))
+                os.replace(tmp_file, meta_file)
+        except Exception as e:
+            self.logger.warning(f"保存代币信息缓存失败: {e}")
+    
+    def get_contract(self, address: str, kind: str):
+        """获取合约对象 (kind: v3_pool / v2_pool / erc20 / multicall3)"""
+        return _build_contract(self.w3, address, kind)
+    
+    def get_multicall3_contract(self):
+        """获取Multicall3合约对象"""
+        multicall_address = self.config.get('api_settings', {}).get('multicall3', MULTICALL3_ADDRESS)
+        return self.get_contract(multicall_address, 'multicall3')
+    
+    def multicall(self, calls: List[Tuple[str, str]]) -> List[bytes]:
+        """通过Multicall3在一次eth_call中执行多个只读调用
+        
+        Args:
+            calls: [(目标合约地址, calldata), ...]
+            
+        Returns:
+            每个调用的原始返回数据，顺序与calls一致
+        """
+        if not calls:
+            return []
+        
+        results = self.get_multicall3_contract().functions.aggregate3(
+            [(target, False, calldata) for target, calldata in calls]
+        ).call()
+        return [return_data for _, return_data in results]
+    
+    def multicall_batch(self, call_groups: List[List[Tuple[str, str]]]) -> List[Optional[List[bytes]]]:
+        """把多组调用合并到一次aggregate3中，一次eth_call完成
+        
+        单次eth_call的gas和返回数据有上限，按 api_settings.batch_size 组分块；
+        分成多块时各块在线程池中并发发送，总耗时约等于最慢的一块。
+        
+        Args:
+            call_groups: [[(目标合约地址, calldata), ...], ...]，各组展平后放入同一次aggregate3
+            
+        Returns:
+            每组调用的返回数据列表，顺序与call_groups一致；失败的组为None
+        """
+        results: List[Optional[List[bytes]]] = [[] for _ in call_groups]
+        pending = iter([i for i, calls in enumerate(call_groups) if calls])
+        batch_size = max(1, self.config.get('api_settings', {}).get('batch_size', 20))
+        
+        chunks = []
+        while True:
+            chunk = list(islice(pending, batch_size))
+            if not chunk:
+                break
+            chunks.append(chunk)
+        
+        if len(chunks) == 1:
+            chunk_results = [self.multicall_chunk([call_groups[i] for i in chunks[0]])]
+        else:
+            chunk_results = self.rpc_executor.map(
+                self.multicall_chunk, [[call_groups[i] for i in chunk] for chunk in chunks]
+            )
+        
+        for chunk, chunk_result in zip(chunks, chunk_results):
+            for i, result in zip(chunk, chunk_result):
+                results[i] = result
+        
+        return results
+    
+    def multicall_chunk(self, call_groups: List[List[Tuple[str, str]]]) -> List[Optional[List[bytes]]]:
+        """把多组调用合并成一次aggregate3 (一次eth_call)，在本地按组拆分结果
+        
+        各调用设置allowFailure=True，单个池出错只会让该组结果为None，不影响其它池；
+        整个aggregate3失败时退回逐组调用。
+        """
+        flat_calls = [(target, True, calldata) for calls in call_groups for target, calldata in calls]
+        try:
+            responses = self.get_multicall3_contract().functions.aggregate3(flat_calls).call()
+        except Exception as e:
+            self.logger.warning(f"合并的Multicall3调用失败，改为逐组调用: {e}")
+        else:
+            results: List[Optional[List[bytes]]] = []
+            offset = 0
+            for calls in call_groups:
+                group = responses[offset:offset + len(calls)]
+                offset += len(calls)
+                results.append([return_data for _, return_data in group] if all(success for success, _ in group) else None)
+            return results
+        
+        results = []
+        for calls in call_groups:
+            try:
+                results.append(self.multicall(calls))
+            except Exception as e:
+                self.logger.error(f"Multicall3调用失败: {e}")
+                results.append(None)
+        return results
     
     def detect_pool_type(self, pool_address: str) -> str:
-        """检测池类型 (V2 或 V3)"""
+        """检测池类型 (V2 或 V3)
+        
+        先取一次合约字节码，在本地查找V3特有的fee()和V2特有的getReserves()选择器；
+        字节码中找不到时 (如代理合约) 再退回试调用的方式。
+        """
+        try:
+            code = bytes(self.w3.eth.get_code(_checksum(pool_address)))
+            if V3_FEE_SELECTOR in code:
+                return "v3"
+            if V2_GET_RESERVES_SELECTOR in code:
+                return "v2"
+        except Exception as e:
+            self.logger.warning(f"获取池 {pool_address} 字节码失败: {e}")
+        
         try:
             # 尝试V3池的方法
-            pool_contract = self.w3.eth.contract(
-                address=Web3.to_checksum_address(pool_address),
-                abi=self.get_v3_pool_abi()
-            )
+            pool_contract = self.get_contract(pool_address, 'v3_pool')
             
             # 尝试调用V3特有的fee()方法
             pool_contract.functions.fee().call()
@@ -236,10 +681,7 @@ class LPMonitor:
         except Exception:
             try:
                 # 尝试V2池的方法
-                pool_contract = self.w3.eth.contract(
-                    address=Web3.to_checksum_address(pool_address),
-                    abi=self.get_v2_pool_abi()
-                )
+                pool_contract = self.get_contract(pool_address, 'v2_pool')
                 
                 # 尝试调用V2特有的getReserves()方法
                 pool_contract.functions.getReserves().call()
@@ -248,103 +690,175 @@ class LPMonitor:
             except Exception:
                 return "unknown"
     
-    def get_token_info(self, token_address: str) -> Optional[Tuple[str, int]]:
-        """获取代币信息"""
-        try:
-            token_contract = self.w3.eth.contract(
-                address=Web3.to_checksum_address(token_address),
-                abi=self.get_erc20_abi()
-            )
-            
-            symbol = token_contract.functions.symbol().call()
-            decimals = token_contract.functions.decimals().call()
-            
-            return (symbol, decimals)
-        except Exception as e:
-            self.logger.error(f"获取代币 {token_address} 信息失败: {e}")
-            return None
+    def detect_pool_type_cached(self, pool_address: str) -> str:
+        """检测池类型并缓存，同一个池 (包括无法识别的池) 在进程内只检测一次"""
+        pool_address = _checksum(pool_address)
+        pool_type = self.pool_type_cache.get(pool_address)
+        if pool_type is None:
+            pool_type = self.detect_pool_type(pool_address)
+            self.pool_type_cache[pool_address] = pool_type
+            self.logger.info(f"自动检测池 {pool_address} 类型: {pool_type}")
+            if pool_type != "unknown":
+                self.pool_types_dirty = True
+        return pool_type
     
-    def get_v3_pool_reserves(self, pool_address: str) -> Optional[Tuple[str, str, float, float, int, int]]:
-        """获取V3池的储备量和代币信息"""
-        try:
-            pool_contract = self.w3.eth.contract(
-                address=Web3.to_checksum_address(pool_address),
-                abi=self.get_v3_pool_abi()
-            )
-            
-            # 获取代币地址
-            token0_address = pool_contract.functions.token0().call()
-            token1_address = pool_contract.functions.token1().call()
-            
-            # 获取代币信息
-            token0_info = self.get_token_info(token0_address)
-            token1_info = self.get_token_info(token1_address)
-            
-            if not token0_info or not token1_info:
-                return None
-                
-            token0_symbol, token0_decimals = token0_info
-            token1_symbol, token1_decimals = token1_info
-            
-            # 获取代币合约
-            erc20_abi = self.get_erc20_abi()
-            token0_contract = self.w3.eth.contract(address=token0_address, abi=erc20_abi)
-            token1_contract = self.w3.eth.contract(address=token1_address, abi=erc20_abi)
-            
-            # 获取池中的代币余额
-            token0_balance = token0_contract.functions.balanceOf(pool_address).call()
-            token1_balance = token1_contract.functions.balanceOf(pool_address).call()
-            
-            # 转换为人类可读的数量
-            token0_amount = token0_balance / (10 ** token0_decimals)
-            token1_amount = token1_balance / (10 ** token1_decimals)
-            
-            return (token0_symbol, token1_symbol, token0_amount, token1_amount, 
-                   token0_decimals, token1_decimals)
-                   
-        except Exception as e:
-            self.logger.error(f"获取V3池 {pool_address} 数据失败: {e}")
-            return None
+    def get_pool_type(self, pool_config: Dict) -> str:
+        """获取池类型，配置中未指定时自动检测，结果在本轮结束时保存到 data/pool_types.json"""
+        pool_type = pool_config.get('pool_type', 'v3')
+        if pool_type in ('v2', 'v3'):
+            return pool_type
+        return self.detect_pool_type_cached(pool_config['contract_address'])
     
-    def get_v2_pool_reserves(self, pool_address: str) -> Optional[Tuple[str, str, float, float, int, int]]:
-        """获取V2池的储备量和代币信息"""
-        try:
-            pool_contract = self.w3.eth.contract(
-                address=Web3.to_checksum_address(pool_address),
-                abi=self.get_v2_pool_abi()
-            )
-            
-            # 获取代币地址
-            token0_address = pool_contract.functions.token0().call()
-            token1_address = pool_contract.functions.token1().call()
-            
-            # 获取代币信息
-            token0_info = self.get_token_info(token0_address)
-            token1_info = self.get_token_info(token1_address)
+    def get_pools_reserves(self, pools: List[Tuple[str, str]]) -> List[Optional[PoolReserves]]:
+        """批量获取多个LP池的储备量和代币信息
+        
+        所有池的调用展平后放进Multicall3 aggregate3，每 batch_size 组一次eth_call，请求数不再随池数量增长。
+        池的代币地址只在第一次查询时获取并缓存，之后每轮只需一轮aggregate3获取余额/储备量。
+        
+        Args:
+            pools: [(池地址, 池类型), ...]
             
-            if not token0_info or not token1_info:
-                return None
+        Returns:
+            与pools顺序一致的PoolReserves，获取失败的池为None
+        """
+        # 日志方法绑定到局部变量，循环中不再重复查找属性
+        error = self.logger.error
+        
+        pool_infos = []
+        for pool_address, pool_type in pools:
+            pool_address = _checksum(pool_address)
+            if pool_type not in ('v2', 'v3'):
+                pool_type = self.detect_pool_type_cached(pool_address)
+            pool_infos.append((pool_address, pool_type))
+        
+        # 第一轮: 只为代币地址未缓存的池获取token0/token1 (池的代币地址不会变化)
+        round1_groups = []
+        for pool_address, pool_type in pool_infos:
+            if pool_type not in ('v2', 'v3'):
+                error(f"未知的池类型: {pool_type} (池地址: {pool_address})")
+                round1_groups.append([])
+            elif pool_address in self.pool_tokens_cache:
+                round1_groups.append([])
+            else:
+                pool_contract = self.get_contract(pool_address, f'{pool_type}_pool')
+                round1_groups.append([
+                    (pool_address, pool_contract.encode_abi('token0')),
+                    (pool_address, pool_contract.encode_abi('token1'))
+                ])
+        
+        round1_results = self.multicall_batch(round1_groups)
+        
+        pool_tokens: List[Optional[Tuple[str, str]]] = []
+        for (pool_address, pool_type), results in zip(pool_infos, round1_results):
+            if pool_type not in ('v2', 'v3'):
+                # 未知类型的池即使配置中写明了代币地址也跳过，不查询其代币信息和余额
+                pool_tokens.append(None)
+                continue
+            if pool_address in self.pool_tokens_cache:
+                pool_tokens.append(self.pool_tokens_cache[pool_address])
+                continue
+            if not results:
+                pool_tokens.append(None)
+                continue
+            try:
+                token0_address = _checksum(self.w3.codec.decode(['address'], results[0])[0])
+                token1_address = _checksum(self.w3.codec.decode(['address'], results[1])[0])
+                self.pool_tokens_cache[pool_address] = (token0_address, token1_address)
+                pool_tokens.append((token0_address, token1_address))
+            except Exception as e:
+                error(f"获取{pool_type.upper()}池 {pool_address} 数据失败: {e}")
+                pool_tokens.append(None)
+        
+        # 第二轮: 缓存中没有的每个代币各一组 (symbol/decimals)，每个池的余额/储备量各一组
+        # 单个代币调用失败只影响自己这一组，其它代币仍能正常缓存
+        missing = []
+        for tokens in pool_tokens:
+            if tokens:
+                for address in tokens:
+                    if address not in self.token_meta_cache and address not in missing:
+                        missing.append(address)
+        
+        round2_groups = []
+        for address in missing:
+            token_contract = self.get_contract(address, 'erc20')
+            round2_groups.append([
+                (address, token_contract.encode_abi('symbol')),
+                (address, token_contract.encode_abi('decimals'))
+            ])
+        
+        for (pool_address, pool_type), tokens in zip(pool_infos, pool_tokens):
+            if not tokens:
+                round2_groups.append([])
+            elif pool_type == 'v3':
+                token0_contract = self.get_contract(tokens[0], 'erc20')
+                token1_contract = self.get_contract(tokens[1], 'erc20')
+                round2_groups.append([
+                    (tokens[0], token0_contract.encode_abi('balanceOf', args=[pool_address])),
+                    (tokens[1], token1_contract.encode_abi('balanceOf', args=[pool_address]))
+                ])
+            elif pool_type == 'v2':
+                pool_contract = self.get_contract(pool_address, 'v2_pool')
+                round2_groups.append([(pool_address, pool_contract.encode_abi('getReserves'))])
+            else:
+                round2_groups.append([])
+        
+        round2_results = self.multicall_batch(round2_groups)
+        
+        if missing:
+            for address, meta_results in zip(missing, round2_results):
+                if not meta_results:
+                    error(f"获取代币 {address} 信息失败: symbol()/decimals()调用未成功")
+                    continue
+                try:
+                    symbol = self.w3.codec.decode(['string'], meta_results[0])[0]
+                    decimals = self.w3.codec.decode(['uint8'], meta_results[1])[0]
+                    with self.token_meta_lock:
+                        self.token_meta_cache[address] = (symbol, decimals)
+                except Exception as e:
+                    error(f"获取代币 {address} 信息失败: {e}")
+            self.save_token_meta_cache()
+        
+        reserves_list = []
+        for (pool_address, pool_type), tokens, results in zip(pool_infos, pool_tokens, round2_results[len(missing):]):
+            if not tokens or not results:
+                reserves_list.append(None)
+                continue
+            unknown_tokens = [address for address in tokens if address not in self.token_meta_cache]
+            if unknown_tokens:
+                error(f"池 {pool_address} 缺少代币信息，跳过本轮: {', '.join(unknown_tokens)}")
+                reserves_list.append(None)
+                continue
+            try:
+                token0_address, token1_address = tokens
+                if pool_type == 'v3':
+                    balances = (self.w3.codec.decode(['uint256'], results[0])[0],
+                                self.w3.codec.decode(['uint256'], results[1])[0])
+                else:
+                    balances = self.w3.codec.decode(['uint112', 'uint112', 'uint32'], results[0])[:2]
+                token0_symbol, token0_decimals = self.token_meta_cache[token0_address]
+                token1_symbol, token1_decimals = self.token_meta_cache[token1_address]
                 
-            token0_symbol, token0_decimals = token0_info
-            token1_symbol, token1_decimals = token1_info
-            
-            # 获取储备量
-            reserves = pool_contract.functions.getReserves().call()
-            token0_reserve = reserves[0]
-            token1_reserve = reserves[1]
-            
-            # 转换为人类可读的数量
-            token0_amount = token0_reserve / (10 ** token0_decimals)
-            token1_amount = token1_reserve / (10 ** token1_decimals)
-            
-            return (token0_symbol, token1_symbol, token0_amount, token1_amount, 
-                   token0_decimals, token1_decimals)
-                   
-        except Exception as e:
-            self.logger.error(f"获取V2池 {pool_address} 数据失败: {e}")
-            return None
+                # 转换为人类可读的数量 (Decimal按精度移位，不损失大额储备量的精度)
+                token0_amount = Decimal(balances[0]).scaleb(-token0_decimals)
+                token1_amount = Decimal(balances[1]).scaleb(-token1_decimals)
+                
+                reserves_list.append((token0_symbol, token1_symbol, token0_amount, token1_amount,
+                                      token0_decimals, token1_decimals, balances[0], balances[1]))
+            except Exception as e:
+                error(f"获取{pool_type.upper()}池 {pool_address} 数据失败: {e}")
+                reserves_list.append(None)
+        
+        return reserves_list
+    
+    def get_v3_pool_reserves(self, pool_address: str) -> Optional[PoolReserves]:
+        """获取V3池的储备量和代币信息 - 通过Multicall3批量调用"""
+        return self.get_pools_reserves([(pool_address, 'v3')])[0]
+    
+    def get_v2_pool_reserves(self, pool_address: str) -> Optional[PoolReserves]:
+        """获取V2池的储备量和代币信息 - 通过Multicall3批量调用"""
+        return self.get_pools_reserves([(pool_address, 'v2')])[0]
             
-    def get_pool_reserves(self, pool_address: str, pool_type: str = None) -> Optional[Tuple[str, str, float, float, int, int]]:
+    def get_pool_reserves(self, pool_address: str, pool_type: str = None) -> Optional[PoolReserves]:
         """获取LP池的储备量和代币信息"""
         if pool_type is None:
             pool_type = self.detect_pool_type(pool_address)
@@ -357,40 +871,25 @@ class LPMonitor:
             self.logger.error(f"未知的池类型: {pool_type} (池地址: {pool_address})")
             return None
     
-    def is_cache_valid(self, cache_entry: Dict) -> bool:
-        """检查缓存是否有效"""
-        if not cache_entry:
-            return False
-        
-        cache_time = cache_entry.get('timestamp')
-        if not cache_time:
-            return False
-        
-        now = datetime.now()
-        ttl = timedelta(minutes=self.cache_ttl_minutes)
-        
-        return (now - cache_time) < ttl
-    
     def get_cached_price(self, symbol: str) -> Optional[float]:
         """从缓存获取价格"""
-        with self.price_cache_lock:
-            cache_entry = self.price_cache.get(symbol.upper())
-            if self.is_cache_valid(cache_entry):
-                self.logger.debug(f"使用缓存价格 {symbol}: ${cache_entry['price']} (来源: {cache_entry['source']})")
-                return cache_entry['price']
+        cached = self.price_store.get(symbol.upper())
+        if cached:
+            price, source = cached
+            self.logger.debug(f"使用缓存价格 {symbol}: ${price} (来源: {source})")
+            return price
         return None
     
     def set_cached_price(self, symbol: str, price: float, source: str = 'api') -> None:
         """设置缓存价格"""
-        with self.price_cache_lock:
-            self.price_cache[symbol.upper()] = {
-                'price': price,
-                'timestamp': datetime.now(),
-                'source': source
-            }
+        self.price_store.set(symbol.upper(), price, source)
     
     def get_coingecko_mapping(self) -> Dict[str, str]:
-        """从配置文件动态获取代币符号到CoinGecko ID的映射"""
+        """获取代币符号到CoinGecko ID的映射 (加载配置时已预先构建)"""
+        return self.coingecko_mapping
+    
+    def build_coingecko_mapping(self) -> Dict[str, str]:
+        """从配置文件构建代币符号到CoinGecko ID的映射"""
         mapping = {
             'WBNB': 'binancecoin',  # WBNB应该使用BNB的价格，因为它们1:1兑换
             'BNB': 'binancecoin', 
@@ -408,9 +907,12 @@ class LPMonitor:
         
         return mapping
     
-    
     def get_dexscreener_pair_addresses(self) -> Dict[str, str]:
-        """从配置文件动态获取代币到DexScreener交易对地址的映射"""
+        """获取代币到DexScreener交易对地址的映射 (加载配置时已预先构建)"""
+        return self.dexscreener_pair_addresses
+    
+    def build_dexscreener_pair_addresses(self) -> Dict[str, str]:
+        """从配置文件构建代币到DexScreener交易对地址的映射 (地址转为小写，请求时无需再转换)"""
         mapping = {}
         
         # 从配置文件的pools部分获取交易对地址
@@ -420,53 +922,73 @@ class LPMonitor:
                 target_token = pool.get('target_token')
                 pool_address = pool.get('contract_address')
                 if target_token and pool_address:
-                    mapping[target_token.upper()] = pool_address
+                    mapping[target_token.upper()] = pool_address.lower()
         
         return mapping
     
     def fetch_prices_from_dexscreener(self, symbols: List[str]) -> Dict[str, float]:
-        """从DexScreener获取价格"""
+        """从DexScreener获取价格 - 多个交易对合并成一次请求 (每次最多30个)"""
+        info = self.logger.info
+        warn = self.logger.warning
+        log_info = self.logger.isEnabledFor(logging.INFO)
         pair_mapping = self.get_dexscreener_pair_addresses()
         prices = {}
         
+        # 交易对地址(小写) -> 代币符号
+        pair_to_symbols: Dict[str, List[str]] = {}
         for symbol in symbols:
             symbol_upper = symbol.upper()
             pair_address = pair_mapping.get(symbol_upper)
+            if pair_address:
+                pair_to_symbols.setdefault(pair_address, []).append(symbol_upper)
+        
+        pair_addresses = list(pair_to_symbols)
+        for start in range(0, len(pair_addresses), DEXSCREENER_MAX_PAIRS):
+            chunk = pair_addresses[start:start + DEXSCREENER_MAX_PAIRS]
+            chunk_symbols = [s for pair in chunk for s in pair_to_symbols[pair]]
             
-            if not pair_address:
-                continue
-                
             try:
-                url = f"https://api.dexscreener.com/latest/dex/pairs/bsc/{pair_address}"
-                self.logger.info(f"从DexScreener获取 {symbol} 价格: {pair_address}")
+                url = f"https://api.dexscreener.com/latest/dex/pairs/bsc/{','.join(chunk)}"
+                info(f"从DexScreener批量获取 {len(chunk)} 个交易对价格: {chunk_symbols}")
+                
+                response = self.http.get(url, timeout=15)
                 
-                response = requests.get(url, timeout=15)
+                if response.status_code != 200:
+                    warn(f"DexScreener API请求失败 {chunk_symbols}: {response.status_code}")
+                    continue
                 
-                if response.status_code == 200:
-                    data = response.json()
-                    if 'pair' in data and data['pair']:
-                        pair_data = data['pair']
-                        
-                        # 获取USD价格
-                        price_usd = pair_data.get('priceUsd')
+                data = orjson.loads(response.content)
+                pairs = data.get('pairs') or ([data['pair']] if data.get('pair') else [])
+                for pair_data in pairs:
+                    pair_symbols = pair_to_symbols.get((pair_data.get('pairAddress') or '').lower())
+                    if not pair_symbols:
+                        continue
+                    
+                    # 获取USD价格
+                    price_usd = pair_data.get('priceUsd')
+                    for symbol_upper in pair_symbols:
                         if price_usd:
                             price = float(price_usd)
                             prices[symbol_upper] = price
-                            self.logger.info(f"DexScreener价格 {symbol}: ${price}")
+                            if log_info:
+                                info(f"DexScreener价格 {symbol_upper}: ${price}")
                         else:
-                            self.logger.warning(f"DexScreener未找到 {symbol} 的USD价格")
-                    else:
-                        self.logger.warning(f"DexScreener未找到交易对数据: {pair_address}")
-                else:
-                    self.logger.warning(f"DexScreener API请求失败 {symbol}: {response.status_code}")
+                            warn(f"DexScreener未找到 {symbol_upper} 的USD价格")
+                
+                for pair in chunk:
+                    if not any(s in prices for s in pair_to_symbols[pair]):
+                        warn(f"DexScreener未找到交易对数据: {pair}")
                     
             except Exception as e:
-                self.logger.warning(f"从DexScreener获取 {symbol} 价格失败: {e}")
+                warn(f"从DexScreener获取 {chunk_symbols} 价格失败: {e}")
         
         return prices
     
     def fetch_prices_from_coingecko(self, symbols: List[str]) -> Dict[str, float]:
         """批量从CoinGecko获取价格"""
+        info = self.logger.info
+        warn = self.logger.warning
+        log_info = self.logger.isEnabledFor(logging.INFO)
         coingecko_mapping = self.get_coingecko_mapping()
         prices = {}
         
@@ -491,93 +1013,105 @@ class LPMonitor:
                 'vs_currencies': 'usd'
             }
             
-            self.logger.info(f"批量从CoinGecko获取 {len(coingecko_ids)} 个代币价格: {list(symbol_to_id.values())}")
-            response = requests.get(url, params=params, timeout=15)
+            info(f"批量从CoinGecko获取 {len(coingecko_ids)} 个代币价格: {list(symbol_to_id.values())}")
+            self.coingecko_bucket.consume()
+            response = self.http.get(url, params=params, timeout=15)
             
             if response.status_code == 200:
-                data = response.json()
+                data = orjson.loads(response.content)
                 for coingecko_id, price_data in data.items():
                     symbol = symbol_to_id.get(coingecko_id)
                     price = price_data.get('usd')
                     if symbol and price:
                         prices[symbol] = float(price)
-                        self.logger.info(f"CoinGecko价格 {symbol}: ${price}")
+                        if log_info:
+                            info(f"CoinGecko价格 {symbol}: ${price}")
             else:
-                self.logger.warning(f"CoinGecko API请求失败: {response.status_code}")
+                warn(f"CoinGecko API请求失败: {response.status_code}")
                 
         except Exception as e:
-            self.logger.warning(f"批量获取CoinGecko价格失败: {e}")
+            warn(f"批量获取CoinGecko价格失败: {e}")
         
         return prices
     
     def get_token_price(self, symbol: str) -> Optional[float]:
-        """获取代币价格 - 带缓存机制，移除模拟价格逻辑"""
-        symbol_upper = symbol.upper()
-        
-        # 首先检查缓存
-        cached_price = self.get_cached_price(symbol_upper)
-        if cached_price is not None:
-            return cached_price
-        
-        # 尝试从DexScreener获取
-        dexscreener_prices = self.fetch_prices_from_dexscreener([symbol_upper])
-        if symbol_upper in dexscreener_prices:
-            price = dexscreener_prices[symbol_upper]
-            self.set_cached_price(symbol_upper, price, 'dexscreener')
-            return price
-        
-        # 尝试从CoinGecko获取
-        coingecko_prices = self.fetch_prices_from_coingecko([symbol_upper])
-        if symbol_upper in coingecko_prices:
-            price = coingecko_prices[symbol_upper]
-            self.set_cached_price(symbol_upper, price, 'coingecko')
-            return price
-        
-        # 如果都获取失败，返回None
-        self.logger.warning(f"无法获取 {symbol} 的价格，所有API源都失败")
-        return None
+        """获取单个代币价格 - 与批量获取共用缓存和数据源回退逻辑"""
+        return self.get_multiple_token_prices([symbol]).get(symbol.upper())
     
     def get_multiple_token_prices(self, symbols: List[str]) -> Dict[str, float]:
         """批量获取多个代币价格 - 优先使用DexScreener，移除模拟价格"""
-        prices = {}
-        uncached_symbols = []
+        # 统一大写并去重 (USDT/WBNB等常见计价代币会在多个池中重复出现)
+        requested = {symbol.upper() for symbol in symbols}
         
         # 检查缓存
-        for symbol in symbols:
-            cached_price = self.get_cached_price(symbol)
-            if cached_price is not None:
-                prices[symbol.upper()] = cached_price
-            else:
-                uncached_symbols.append(symbol)
+        cached = {symbol: self.get_cached_price(symbol) for symbol in requested}
+        prices = {symbol: price for symbol, price in cached.items() if price is not None}
+        missing = requested - prices.keys()
         
         # 批量获取未缓存的价格
-        if uncached_symbols:
-            # 优先尝试DexScreener
-            dexscreener_prices = self.fetch_prices_from_dexscreener(uncached_symbols)
-            
-            # 对于DexScreener未获取到的，再尝试CoinGecko
-            remaining_symbols = [s for s in uncached_symbols if s.upper() not in dexscreener_prices]
-            coingecko_prices = self.fetch_prices_from_coingecko(remaining_symbols) if remaining_symbols else {}
-            
-            for symbol in uncached_symbols:
-                symbol_upper = symbol.upper()
-                if symbol_upper in dexscreener_prices:
-                    price = dexscreener_prices[symbol_upper]
-                    self.set_cached_price(symbol_upper, price, 'dexscreener')
-                    prices[symbol_upper] = price
-                elif symbol_upper in coingecko_prices:
-                    price = coingecko_prices[symbol_upper]
-                    self.set_cached_price(symbol_upper, price, 'coingecko')
-                    prices[symbol_upper] = price
-                else:
-                    # 如果无法获取价格，记录警告但不添加到prices中
-                    self.logger.warning(f"无法获取 {symbol} 的价格")
+        if missing:
+            # 只对未命中的代币加锁 (按名称顺序加锁避免死锁)，读缓存不加锁；
+            # 多个线程同时缺同一个代币的价格时只有一个线程去请求
+            with ExitStack() as stack:
+                for symbol in sorted(missing):
+                    stack.enter_context(self.symbol_locks.setdefault(symbol, Lock()))
+                
+                # 等锁期间其它线程可能已经写入了缓存
+                for symbol in list(missing):
+                    price = self.get_cached_price(symbol)
+                    if price is not None:
+                        prices[symbol] = price
+                        missing.discard(symbol)
+                
+                if missing:
+                    prices.update(self.fetch_missing_prices(missing))
+        
+        return prices
+    
+    def refresh_prices(self, symbols: List[str]) -> Dict[str, float]:
+        """后台刷新价格，与 get_multiple_token_prices 共用按代币的锁
+        
+        正被其它线程请求的代币直接跳过 (不等待锁)，同一代币不会被重复请求
+        """
+        with ExitStack() as stack:
+            locked = set()
+            for symbol in symbols:
+                lock = self.symbol_locks.setdefault(symbol, Lock())
+                if lock.acquire(blocking=False):
+                    stack.callback(lock.release)
+                    locked.add(symbol)
+            return self.fetch_missing_prices(locked) if locked else {}
+    
+    def fetch_missing_prices(self, missing: Set[str]) -> Dict[str, float]:
+        """从API获取缓存中没有的价格并写入缓存"""
+        warn = self.logger.warning
+        prices = {}
+        
+        # DexScreener和CoinGecko同时请求，总耗时取两者中较慢的一个
+        coingecko_future = self.coingecko_executor.submit(self.fetch_prices_from_coingecko, list(missing))
+        dexscreener_prices = self.fetch_prices_from_dexscreener(list(missing))
+        coingecko_prices = coingecko_future.result()
+        
+        # 两边都有价格时优先使用DexScreener
+        for symbol, price in dexscreener_prices.items():
+            self.set_cached_price(symbol, price, 'dexscreener')
+        prices.update(dexscreener_prices)
+        
+        still_missing = missing - dexscreener_prices.keys()
+        for symbol in still_missing & coingecko_prices.keys():
+            price = coingecko_prices[symbol]
+            self.set_cached_price(symbol, price, 'coingecko')
+            prices[symbol] = price
+        
+        # 如果无法获取价格，记录警告但不添加到prices中
+        for symbol in still_missing - coingecko_prices.keys():
+            warn(f"无法获取 {symbol} 的价格")
         
         return prices
     
     def calculate_tvl(self, token0_symbol: str, token1_symbol: str, 
-                     token0_amount: float, token1_amount: float) -> Optional[Tuple[float, float, float, float, float, float, float]]:
-        """计算TVL及各代币占比 - 使用批量价格获取"""
+                     token0_amount: Decimal, token1_amount: Decimal) -> Optional[Tuple[float, float, Decimal, Decimal, Decimal, Decimal, Decimal]]:
+        """计算TVL及各代币占比 - 使用批量价格获取，金额用Decimal计算"""
         # 批量获取两个代币的价格
         prices = self.get_multiple_token_prices([token0_symbol, token1_symbol])
         
@@ -595,31 +1129,36 @@ class LPMonitor:
             return None
         
         # 计算各代币的TVL
-        token0_tvl = token0_amount * token0_price
-        token1_tvl = token1_amount * token1_price
+        token0_tvl = token0_amount * Decimal(str(token0_price))
+        token1_tvl = token1_amount * Decimal(str(token1_price))
         total_tvl = token0_tvl + token1_tvl
         
         # 计算占比
-        token0_percentage = (token0_tvl / total_tvl * 100) if total_tvl > 0 else 0
-        token1_percentage = (token1_tvl / total_tvl * 100) if total_tvl > 0 else 0
+        token0_percentage = (token0_tvl / total_tvl * 100) if total_tvl > 0 else Decimal(0)
+        token1_percentage = (token1_tvl / total_tvl * 100) if total_tvl > 0 else Decimal(0)
         
         return token0_price, token1_price, total_tvl, token0_tvl, token1_tvl, token0_percentage, token1_percentage
     
-    def monitor_pool(self, pool_config: Dict) -> Optional[PoolData]:
-        """监控单个LP池"""
-        pool_address = pool_config['contract_address']
-        pool_type = pool_config.get('pool_type', 'v3')
+    def monitor_pool(self, pool_config: Dict,
+                     reserves_data: Optional[PoolReserves] = None,
+                     now: Optional[datetime] = None) -> Optional[PoolData]:
+        """监控单个LP池
         
-        # 如果配置中没有池类型，自动检测
-        if pool_type not in ['v2', 'v3']:
-            pool_type = self.detect_pool_type(pool_address)
-            self.logger.info(f"自动检测池 {pool_address} 类型: {pool_type}")
+        Args:
+            pool_config: 池配置
+            reserves_data: 已批量获取的储备量数据，为None时单独查询
+            now: 本轮监控的时间戳，同一轮的所有记录共用
+        """
+        if now is None:
+            now = datetime.now()
+        pool_address = pool_config['contract_address']
         
-        reserves_data = self.get_pool_reserves(pool_address, pool_type)
+        if reserves_data is None:
+            reserves_data = self.get_pool_reserves(pool_address, self.get_pool_type(pool_config))
         if not reserves_data:
             return None
         
-        token0_symbol, token1_symbol, token0_amount, token1_amount, _, _ = reserves_data
+        token0_symbol, token1_symbol, token0_amount, token1_amount, _, _, token0_raw, token1_raw = reserves_data
         
         # 计算价格和TVL
         tvl_result = self.calculate_tvl(
@@ -637,210 +1176,240 @@ class LPMonitor:
         if target_token == token0_symbol:
             target_token_amount = token0_amount
             target_token_price = token0_price
+            target_token_raw = token0_raw
         else:
             target_token_amount = token1_amount
             target_token_price = token1_price
+            target_token_raw = token1_raw
         
-        # 创建数据对象
+        # 创建数据对象 (Decimal在这里转为float，用于显示和保存)
         pool_data = PoolData(
-            timestamp=datetime.now().isoformat(),
+            timestamp=now.isoformat(),
             pool_address=pool_address,
             pool_name=pool_config['name'],
             token0_symbol=token0_symbol,
             token1_symbol=token1_symbol,
-            token0_amount=token0_amount,
-            token1_amount=token1_amount,
+            token0_amount=float(token0_amount),
+            token1_amount=float(token1_amount),
             token0_price_usd=token0_price,
             token1_price_usd=token1_price,
-            tvl_usd=total_tvl,
+            tvl_usd=float(total_tvl),
             target_token=target_token,
-            target_token_amount=target_token_amount,
-            target_token_price=target_token_price
+            target_token_amount=float(target_token_amount),
+            target_token_price=target_token_price,
+            token0_tvl=float(token0_tvl),
+            token1_tvl=float(token1_tvl),
+            token0_percentage=float(token0_percentage),
+            token1_percentage=float(token1_percentage),
+            token0_raw=token0_raw,
+            token1_raw=token1_raw,
+            target_token_raw=target_token_raw
         )
         
-        # 添加TVL占比信息到pool_data（用于显示）
-        pool_data.token0_tvl = token0_tvl
-        pool_data.token1_tvl = token1_tvl
-        pool_data.token0_percentage = token0_percentage
-        pool_data.token1_percentage = token1_percentage
-        
         return pool_data
     
     def get_alert_emoji(self, percent: float, threshold: float = 5.0) -> str:
-        """根据变化百分比获取警告emoji"""
+        """根据变化百分比获取警告emoji (超过阈值1/2/3倍分级)"""
         abs_percent = abs(percent)
-        if abs_percent >= threshold * 3:  # 超过阈值3倍
-            return "🚨" if percent < 0 else "🎉"
-        elif abs_percent >= threshold * 2:  # 超过阈值2倍
-            return "⚠️" if percent < 0 else "📈"
-        elif abs_percent >= threshold:  # 超过阈值
-            return "🔻" if percent < 0 else "🔺"
-        else:
-            return "ℹ️"
+        level = (abs_percent >= threshold) + (abs_percent >= threshold * 2) + (abs_percent >= threshold * 3)
+        return _ALERT_EMOJIS[level][percent >= 0]
 
     def send_alert_webhook(self, current_data: PoolData, prev_data: PoolData, 
-                          tvl_change_percent: float, target_change_percent: float, threshold: float) -> None:
+                          deltas: Deltas, threshold: float) -> None:
         """发送报警信息到 webhook"""
         try:
+            tvl_change_percent = deltas.tvl_pct
+            target_change_percent = deltas.target_pct
+            token0_amount_change = deltas.t0_amt_pct
+            token0_tvl_change = deltas.t0_tvl_pct
+            token1_amount_change = deltas.t1_amt_pct
+            token1_tvl_change = deltas.t1_tvl_pct
+            
             # 简化的报警消息
             alert_emoji = self.get_alert_emoji(max(abs(tvl_change_percent), abs(target_change_percent)), threshold)
             
-            # 基本信息
-            message = f"{alert_emoji} {current_data.pool_name} LP池报警\n"
-            message += f"时间: {datetime.now().strftime('%m-%d %H:%M:%S')}\n\n"
-            
-            # TVL变化
-            tvl_color = "🟢" if tvl_change_percent > 0 else "🔴"
-            message += f"{tvl_color} TVL: {tvl_change_percent:+.2f}% (${prev_data.tvl_usd:,.0f} → ${current_data.tvl_usd:,.0f})\n"
-            
-            # 目标代币变化
-            token_color = "🟢" if target_change_percent > 0 else "🔴"
-            message += f"{token_color} {current_data.target_token}: {target_change_percent:+.2f}% ({prev_data.target_token_amount:,.0f} → {current_data.target_token_amount:,.0f})\n\n"
-            
-            # 两个代币的详细变化
-            # Token0变化
-            token0_amount_change = ((current_data.token0_amount - prev_data.token0_amount) / prev_data.token0_amount) * 100
-            token0_tvl_change = ((current_data.token0_tvl - prev_data.token0_tvl) / prev_data.token0_tvl) * 100
-            token0_emoji = "🟢" if token0_amount_change > 0 else "🔴"
+            # 各项变化的颜色标识
+            tvl_color = _EMOJIS[tvl_change_percent > 0]
+            token_color = _EMOJIS[target_change_percent > 0]
+            token0_emoji = _EMOJIS[token0_amount_change > 0]
+            token1_emoji = _EMOJIS[token1_amount_change > 0]
             
-            message += f"{token0_emoji} {current_data.token0_symbol}:\n"
-            message += f"数量: {prev_data.token0_amount:,.0f} → {current_data.token0_amount:,.0f} ({token0_amount_change:+.1f}%)\n"
-            message += f"TVL: ${prev_data.token0_tvl:,.0f} → ${current_data.token0_tvl:,.0f} ({token0_tvl_change:+.1f}%)\n\n"
+            # 各行拼好后一次join成消息
+            message = "\n".join((
+                f"{alert_emoji} {current_data.pool_name} LP池报警",
+                f"时间: {datetime.now():%m-%d %H:%M:%S}",
+                "",
+                f"{tvl_color} TVL: {tvl_change_percent:+.2f}% (${prev_data.tvl_usd:,.0f} → ${current_data.tvl_usd:,.0f})",
+                f"{token_color} {current_data.target_token}: {target_change_percent:+.2f}% ({prev_data.target_token_amount:,.0f} → {current_data.target_token_amount:,.0f})",
+                "",
+                f"{token0_emoji} {current_data.token0_symbol}:",
+                f"数量: {prev_data.token0_amount:,.0f} → {current_data.token0_amount:,.0f} ({token0_amount_change:+.1f}%)",
+                f"TVL: ${prev_data.token0_tvl:,.0f} → ${current_data.token0_tvl:,.0f} ({token0_tvl_change:+.1f}%)",
+                "",
+                f"{token1_emoji} {current_data.token1_symbol}:",
+                f"数量: {prev_data.token1_amount:,.0f} → {current_data.token1_amount:,.0f} ({token1_amount_change:+.1f}%)",
+                f"TVL: ${prev_data.token1_tvl:,.0f} → ${current_data.token1_tvl:,.0f} ({token1_tvl_change:+.1f}%)",
+            ))
             
-            # Token1变化
-            token1_amount_change = ((current_data.token1_amount - prev_data.token1_amount) / prev_data.token1_amount) * 100
-            token1_tvl_change = ((current_data.token1_tvl - prev_data.token1_tvl) / prev_data.token1_tvl) * 100
-            token1_emoji = "🟢" if token1_amount_change > 0 else "🔴"
-            
-            message += f"{token1_emoji} {current_data.token1_symbol}:\n"
-            message += f"数量: {prev_data.token1_amount:,.0f} → {current_data.token1_amount:,.0f} ({token1_amount_change:+.1f}%)\n"
-            message += f"TVL: ${prev_data.token1_tvl:,.0f} → ${current_data.token1_tvl:,.0f} ({token1_tvl_change:+.1f}%)"
-            
-            # 异步发送消息
-            try:
-                loop = asyncio.get_event_loop()
-                if loop.is_running():
-                    # 如果已经在异步上下文中，使用 create_task
-                    asyncio.create_task(send_message_async(message))
-                else:
-                    # 如果不在异步上下文中，创建新的事件循环
-                    asyncio.run(send_message_async(message))
-            except RuntimeError:
-                # 如果在线程中运行，使用 run_coroutine_threadsafe
-                try:
-                    loop = asyncio.new_event_loop()
-                    asyncio.set_event_loop(loop)
-                    loop.run_until_complete(send_message_async(message))
-                    loop.close()
-                except Exception as e:
-                    self.logger.error(f"发送webhook消息失败: {e}")
+            # 交给常驻的后台事件循环异步发送，不阻塞监控循环
+            future = asyncio.run_coroutine_threadsafe(send_message_async(message), self.alert_loop)
+            self.pending_alerts.add(future)
+            future.add_done_callback(self.pending_alerts.discard)
                     
         except Exception as e:
             self.logger.error(f"构建或发送webhook报警消息失败: {e}")
 
-    def check_for_changes(self, current_data: PoolData) -> None:
+    def check_all_for_changes(self, pool_data_list: List[PoolData]) -> None:
+        """检查一轮中所有池的变化 (报警阈值每轮只读取一次)"""
+        threshold = self.config['monitoring'].get('alert_threshold_percent', 5.0)
+        for data in pool_data_list:
+            self.check_for_changes(data, threshold)
+    
+    def check_for_changes(self, current_data: PoolData, threshold: Optional[float] = None) -> None:
         """检查变化并报告 - 带颜色emoji警告"""
         pool_address = current_data.pool_address
-        threshold = self.config['monitoring'].get('alert_threshold_percent', 5.0)
+        prev_data = self.previous_data.get(pool_address)
         
-        if pool_address in self.previous_data:
-            prev_data = self.previous_data[pool_address]
-            
-            # 检查TVL变化
-            tvl_change_percent = ((current_data.tvl_usd - prev_data.tvl_usd) / prev_data.tvl_usd) * 100
+        # TVL和目标代币余额都没变 (池子没有交易、价格也没更新) 时不可能报警，跳过计算
+        if (prev_data is not None and prev_data.tvl_usd == current_data.tvl_usd
+                and prev_data.target_token_raw == current_data.target_token_raw):
+            self.previous_data[pool_address] = current_data
+            return
+        
+        if threshold is None:
+            threshold = self.config['monitoring'].get('alert_threshold_percent', 5.0)
+        
+        if prev_data is not None:
+            # 报警判断只需要TVL变化率 (上一轮数值为0时按0处理)
+            tvl_change_percent = pct(current_data.tvl_usd, prev_data.tvl_usd)
             
-            # 检查目标代币数量变化
-            target_change_percent = ((current_data.target_token_amount - prev_data.target_token_amount) / 
-                                   prev_data.target_token_amount) * 100
+            # 用原始整数余额判断是否超过阈值: |当前-上次| * 10000 >= 阈值(基点) * 上次，没有舍入误差
+            threshold_bps = round(threshold * 100)
+            prev_raw = prev_data.target_token_raw
+            target_alert = prev_raw > 0 and abs(current_data.target_token_raw - prev_raw) * 10000 >= threshold_bps * prev_raw
             
-            if abs(tvl_change_percent) >= threshold or abs(target_change_percent) >= threshold:
+            if fabs(tvl_change_percent) >= threshold or target_alert:
+                # 需要报警时才算出全部变化率
+                deltas = _compute_deltas(current_data, prev_data)
+                target_change_percent = deltas.target_pct
+                
                 # 获取合适的警告emoji
                 tvl_emoji = self.get_alert_emoji(tvl_change_percent, threshold)
-                token_emoji = self.get_alert_emoji(target_change_percent, threshold)
-                
-                self.logger.warning(f"{tvl_emoji} {current_data.pool_name} 检测到重大变化:")
                 
-                # TVL变化颜色标识
-                tvl_color = "🟢" if tvl_change_percent > 0 else "🔴"
-                self.logger.warning(f"   {tvl_color} TVL变化: {tvl_change_percent:.2f}% (${prev_data.tvl_usd:.2f} -> ${current_data.tvl_usd:.2f})")
-                
-                # 代币数量变化颜色标识
-                token_color = "🟢" if target_change_percent > 0 else "🔴"
-                self.logger.warning(f"   {token_color} {current_data.target_token}数量变化: {target_change_percent:.2f}% ({prev_data.target_token_amount:.2f} -> {current_data.target_token_amount:.2f})")
+                # TVL和代币数量变化合并成一条多行日志
+                tvl_color = _EMOJIS[tvl_change_percent > 0]
+                token_color = _EMOJIS[target_change_percent > 0]
+                self.logger.warning(
+                    f"{tvl_emoji} {current_data.pool_name} 检测到重大变化:\n"
+                    f"   {tvl_color} TVL变化: {tvl_change_percent:.2f}% (${prev_data.tvl_usd:.2f} -> ${current_data.tvl_usd:.2f})\n"
+                    f"   {token_color} {current_data.target_token}数量变化: {target_change_percent:.2f}% ({prev_data.target_token_amount:.2f} -> {current_data.target_token_amount:.2f})"
+                )
                 
                 # 发送详细信息到 webhook
-                self.send_alert_webhook(current_data, prev_data, tvl_change_percent, target_change_percent, threshold)
+                self.send_alert_webhook(current_data, prev_data, deltas, threshold)
         
         self.previous_data[pool_address] = current_data
     
-    def save_data(self, pool_data_list: List[PoolData]) -> None:
+    def save_data(self, pool_data_list: List[PoolData], now: Optional[datetime] = None) -> None:
         """保存数据到文件"""
         if not pool_data_list:
             return
             
         data_dir = self.config['output'].get('data_directory', './data')
-        timestamp = datetime.now().strftime('%Y%m%d')
+        timestamp = (now or datetime.now()).strftime('%Y%m%d')
         
-        # 保存为JSON
+        # 每条记录只取一次字段值，JSONL和CSV共用
+        rows = [[getter(data) for getter in _GETTERS] for data in pool_data_list]
+        
+        # 保存为JSONL (每行一条记录，只追加不重写)
         if self.config['output'].get('export_json', True):
-            json_file = f"{data_dir}/lp_data_{timestamp}.json"
-            data_to_save = [asdict(data) for data in pool_data_list]
-            
-            # 加载现有数据
-            existing_data = []
-            if os.path.exists(json_file):
-                try:
-                    with open(json_file, 'r', encoding='utf-8') as f:
-                        existing_data = json.load(f)
-                except:
-                    existing_data = []
-            
-            existing_data.extend(data_to_save)
-            
-            with open(json_file, 'w', encoding='utf-8') as f:
-                json.dump(existing_data, f, indent=2, ensure_ascii=False)
+            json_file = f"{data_dir}/lp_data_{timestamp}.jsonl"
+            if json_file != self.jsonl_path:
+                self.close_jsonl_file()
+                self.jsonl_handle = open(json_file, 'ab', buffering=1 << 16)
+                self.jsonl_path = json_file
+            self.jsonl_handle.write(b''.join(orjson.dumps(dict(zip(_FIELDS, row))) + b'\n' for row in rows))
+            self.jsonl_handle.flush()  # 每轮只flush一次，保证其他进程能读到完整的行
         
         # 保存为CSV
         if self.config['output'].get('export_csv', True):
             csv_file = f"{data_dir}/lp_data_{timestamp}.csv"
-            file_exists = os.path.exists(csv_file)
-            
-            with open(csv_file, 'a', newline='', encoding='utf-8') as f:
-                writer = csv.DictWriter(f, fieldnames=asdict(pool_data_list[0]).keys())
-                if not file_exists:
-                    writer.writeheader()
-                for data in pool_data_list:
-                    writer.writerow(asdict(data))
+            if csv_file != self.csv_path:
+                self.close_csv_file()
+                self.csv_handle = open(csv_file, 'a', newline='', encoding='utf-8', buffering=1 << 18)
+                self.csv_writer = csv.writer(self.csv_handle)
+                self.csv_path = csv_file
+                if self.csv_handle.tell() == 0:
+                    self.csv_writer.writerow(_FIELDS)
+            self.csv_writer.writerows(rows)
+            self.csv_handle.flush()
+    
+    def save_worker(self) -> None:
+        """后台写数据线程: 依次处理队列中的 (pool_data_list, now)，收到None时退出"""
+        while True:
+            item = self.save_queue.get()
+            if item is None:
+                break
+            try:
+                self.save_data(*item)
+            except Exception as e:
+                self.logger.error(f"保存数据失败: {e}")
+    
+    def stop_save_worker(self) -> None:
+        """等队列中的数据写完后关闭数据文件"""
+        self.save_queue.put(None)
+        self.save_thread.join()
+        self.close_data_files()
+    
+    def close_data_files(self) -> None:
+        """关闭保持打开的数据文件"""
+        self.close_jsonl_file()
+        self.close_csv_file()
+    
+    def close_jsonl_file(self) -> None:
+        """关闭保持打开的JSONL文件"""
+        if self.jsonl_handle:
+            self.jsonl_handle.close()
+            self.jsonl_handle = None
+            self.jsonl_path = None
+    
+    def close_csv_file(self) -> None:
+        """关闭保持打开的CSV文件"""
+        if self.csv_handle:
+            self.csv_handle.close()
+            self.csv_handle = None
+            self.csv_writer = None
+            self.csv_path = None
     
     def format_change_percent(self, percent: float, threshold: float = 5.0) -> str:
         """格式化变化百分比并添加合适的emoji"""
-        if abs(percent) >= threshold:
-            if percent > 0:
-                return f"🟢 +{percent:.2f}%"  # 绿色上涨
-            else:
-                return f"🔴 {percent:.2f}%"   # 红色下跌
-        else:
-            if percent > 0:
-                return f"⚪ +{percent:.2f}%"  # 白色小幅上涨
-            else:
-                return f"⚪ {percent:.2f}%"   # 白色小幅下跌
+        up = percent > 0
+        return f"{_LEVEL_EMOJIS[abs(percent) >= threshold, up]} {'+' if up else ''}{percent:.2f}%"
 
-    def print_status(self, pool_data_list: List[PoolData]) -> None:
-        """打印当前状态 - 紧凑表格显示所有LP池"""
-        print(f"\n📊 LP池监控 {datetime.now().strftime('%H:%M:%S')} 💾缓存:{self.get_cache_stats()['cached_tokens']}个")
+    def print_status(self, pool_data_list: List[PoolData], now: Optional[datetime] = None) -> None:
+        """打印当前状态 - 紧凑表格显示所有LP池 (整张表拼好后一次写出)"""
+        now = now or datetime.now()
+        
+        # 与上次打印的数据完全相同时只输出一行，不重绘整张表
+        status_key = tuple((data.pool_address, data.tvl_usd, data.token0_amount, data.token1_amount)
+                           for data in pool_data_list)
+        if pool_data_list and status_key == self.last_status_key:
+            sys.stdout.write(f"⏱  {now.strftime('%H:%M:%S')} 无变化 ({len(pool_data_list)}个池)\n")
+            return
+        self.last_status_key = status_key
+        
+        lines = [f"\n📊 LP池监控 {now.strftime('%H:%M:%S')} 💾缓存:{self.get_cache_stats()['cached_tokens']}个"]
         
         if not pool_data_list:
-            print("❌ 没有数据显示")
+            lines.append("❌ 没有数据显示")
+            sys.stdout.write("\n".join(lines) + "\n")
             return
         
         # 紧凑表格头部
-        print(f"{'池名称':<28} {'总TVL':<20} {'代币1':<40} {'代币2':<40}")
-        print("-" * 128)
+        lines.append(f"{'池名称':<28} {'总TVL':<20} {'代币1':<40} {'代币2':<40}")
+        lines.append("-" * 128)
         
         for data in pool_data_list:
-            # 格式化池名称
-            pool_name = data.pool_name
-          
             # 格式化总TVL
             if data.tvl_usd >= 1000000:
                 tvl_str = f"💎${data.tvl_usd/1000000:.1f}M"
@@ -849,39 +1418,34 @@ class LPMonitor:
             else:
                 tvl_str = f"💰${data.tvl_usd:.0f}"
             
-
             # 格式化代币信息 - 更紧凑
             token0_info = f"🔸{data.token0_percentage:.1f}% {data.token0_symbol} {data.token0_amount:,.0f} ${data.token0_tvl/1000:.0f}K"
             token1_info = f"🔹{data.token1_percentage:.1f}% {data.token1_symbol} {data.token1_amount:,.0f} ${data.token1_tvl/1000:.0f}K"
             
-            # 打印一行显示所有信息
-            print(f"{pool_name:<28} {tvl_str:<20} {token0_info:<40} {token1_info:<40}")
+            # 一行显示所有信息
+            lines.append(f"{data.pool_name:<28} {tvl_str:<20} {token0_info:<40} {token1_info:<40}")
         
-        print("-" * 82)
+        lines.append("-" * 82)
+        sys.stdout.write("\n".join(lines) + "\n")
     
     def get_cache_stats(self) -> Dict[str, int]:
         """获取缓存统计信息"""
-        dexscreener_sources = sum(1 for entry in self.price_cache.values() 
-                                 if entry.get('source') == 'dexscreener' and self.is_cache_valid(entry))
-        
-        return {
-            'cached_tokens': len([entry for entry in self.price_cache.values() if self.is_cache_valid(entry)]),
-            'dexscreener_sources': dexscreener_sources
-        }
+        return self.price_store.stats()
     
     def clear_expired_cache(self) -> None:
         """清理过期的缓存条目"""
-        with self.price_cache_lock:
-            expired_keys = []
-            for symbol, entry in self.price_cache.items():
-                if not self.is_cache_valid(entry):
-                    expired_keys.append(symbol)
-            
-            for key in expired_keys:
-                del self.price_cache[key]
-            
-            if expired_keys:
-                self.logger.debug(f"清理了 {len(expired_keys)} 个过期缓存条目")
+        cleared = self.price_store.clear_expired()
+        if cleared:
+            self.logger.debug(f"清理了 {cleared} 个过期缓存条目")
+    
+    def prefetch_expiring_prices(self) -> None:
+        """剩余有效期不足20%的价格提交到后台刷新，不等待结果"""
+        if self.prefetch_future and not self.prefetch_future.done():
+            return  # 上一次刷新还没完成
+        symbols = self.price_store.expiring(self.cache_ttl_minutes * 60 * 0.2)
+        if symbols:
+            self.logger.debug(f"后台刷新 {len(symbols)} 个即将过期的价格: {symbols}")
+            self.prefetch_future = self.prefetch_executor.submit(self.refresh_prices, symbols)
     
     def run(self) -> None:
         """主监控循环"""
@@ -901,22 +1465,26 @@ class LPMonitor:
         
         try:
             cycle_count = 0
+            next_tick = time.monotonic()
             while True:
                 pool_data_list = []
+                now = datetime.now()  # 本轮所有记录共用同一时间戳
                 
                 # 每10个监控周期清理一次过期缓存
                 if cycle_count % 10 == 0:
                     self.clear_expired_cache()
+                self.prefetch_expiring_prices()
+                
+                # 一次批量请求获取所有池的储备量
+                all_reserves = self.get_pools_reserves(
+                    [(pool['contract_address'], self.get_pool_type(pool)) for pool in enabled_pools]
+                )
                 
                 # 预先批量获取所有需要的代币价格
                 all_symbols = set()
-                for pool_config in enabled_pools:
-                    # 动态获取池中的代币符号
-                    pool_address = pool_config['contract_address']
-                    pool_type = pool_config.get('pool_type', 'v3')
-                    reserves_data = self.get_pool_reserves(pool_address, pool_type)
+                for reserves_data in all_reserves:
                     if reserves_data:
-                        token0_symbol, token1_symbol, _, _, _, _ = reserves_data
+                        token0_symbol, token1_symbol = reserves_data[:2]
                         all_symbols.add(token0_symbol)
                         all_symbols.add(token1_symbol)
                 
@@ -924,24 +1492,52 @@ class LPMonitor:
                     self.logger.info(f"预加载 {len(all_symbols)} 个代币价格到缓存")
                     self.get_multiple_token_prices(list(all_symbols))
                 
-                for pool_config in enabled_pools:
-                    data = self.monitor_pool(pool_config)
+                # 各池并发计算，结果按配置顺序在主线程中处理
+                futures = [
+                    self.executor.submit(self.monitor_pool, pool_config, reserves_data, now)
+                    for pool_config, reserves_data in zip(enabled_pools, all_reserves)
+                    if reserves_data
+                ]
+                for future in futures:
+                    data = future.result()
                     if data:
                         pool_data_list.append(data)
-                        self.check_for_changes(data)
+                self.check_all_for_changes(pool_data_list)
                 
                 if pool_data_list:
-                    self.save_data(pool_data_list)
+                    self.save_queue.put((pool_data_list, now))
                     if self.config['output'].get('console_log', True):
-                        self.print_status(pool_data_list)
+                        self.print_status(pool_data_list, now)
                 
+                self.save_pool_types_cache()
                 cycle_count += 1
-                time.sleep(interval)
+                
+                # 按固定节拍休眠，扣除本轮处理耗时；超时则跳到下一个整数倍节拍
+                next_tick += interval
+                now_mono = time.monotonic()
+                if next_tick < now_mono:
+                    next_tick += ((now_mono - next_tick) // interval + 1) * interval
+                time.sleep(max(0, next_tick - now_mono))
                 
         except KeyboardInterrupt:
             print("\n\n👋 监控已停止")
         except Exception as e:
             self.logger.error(f"监控过程中发生错误: {e}")
+        finally:
+            self.executor.shutdown(wait=False)
+            self.rpc_executor.shutdown(wait=False)
+            self.prefetch_executor.shutdown(wait=False)
+            self.coingecko_executor.shutdown(wait=False)
+            self.stop_save_worker()
+            # 先等待仍在发送的报警，再关闭webhook会话，避免中断发送
+            _, not_done = wait_futures(list(self.pending_alerts), timeout=10)
+            if not_done:
+                self.logger.warning(f"{len(not_done)} 条报警在退出前未发送完成")
+            try:
+                asyncio.run_coroutine_threadsafe(close_session(), self.alert_loop).result(timeout=5)
+            except Exception as e:
+                self.logger.warning(f"关闭webhook会话失败: {e}")
+            self.log_listener.stop()  # 写完队列中剩余的日志
 
 
 def main():
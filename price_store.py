@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+价格缓存存储模块
+支持进程内存和Redis两种后端，Redis后端可在重启后保留缓存，也能在多个监控进程间共享
+"""
+
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import orjson
+
+
+class MemoryPriceStore:
+    """进程内存价格缓存 (单键读写在GIL下是原子的，无需加锁)
+
+    条目数超过 max_entries 时淘汰最久未使用的代币，内存占用有上限
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int = 4096):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.entries: OrderedDict = OrderedDict()  # {symbol: {price: float, expires_at: float (单调时钟), source: str}}，按最近使用排序
+
+    def get(self, symbol: str) -> Optional[Tuple[float, str]]:
+        """获取未过期的 (价格, 来源)"""
+        entry = self.entries.get(symbol)
+        if entry and entry['expires_at'] > time.monotonic():
+            try:
+                self.entries.move_to_end(symbol)
+            except KeyError:
+                pass  # 刚被其它线程淘汰
+            return entry['price'], entry['source']
+        return None
+
+    def set(self, symbol: str, price: float, source: str) -> None:
+        """写入价格，超出容量时淘汰最久未使用的条目"""
+        self.entries[symbol] = {
+            'price': price,
+            'expires_at': time.monotonic() + self.ttl_seconds,
+            'source': source
+        }
+        self.entries.move_to_end(symbol)
+        while len(self.entries) > self.max_entries:
+            try:
+                self.entries.popitem(last=False)
+            except KeyError:
+                break
+
+    def stats(self) -> Dict[str, int]:
+        """统计有效缓存数量 (单次遍历)"""
+        now = time.monotonic()
+        cached_tokens = dexscreener_sources = 0
+        for entry in list(self.entries.values()):
+            if entry['expires_at'] > now:
+                cached_tokens += 1
+                if entry['source'] == 'dexscreener':
+                    dexscreener_sources += 1
+        return {
+            'cached_tokens': cached_tokens,
+            'dexscreener_sources': dexscreener_sources
+        }
+
+    def expiring(self, within_seconds: float) -> List[str]:
+        """仍然有效、但将在 within_seconds 秒内过期的代币"""
+        now = time.monotonic()
+        deadline = now + within_seconds
+        return [symbol for symbol, entry in list(self.entries.items())
+                if now < entry['expires_at'] <= deadline]
+
+    def clear_expired(self) -> int:
+        """清理过期条目，返回清理数量"""
+        now = time.monotonic()
+        expired_keys = [symbol for symbol, entry in list(self.entries.items())
+                        if entry['expires_at'] <= now]
+        for key in expired_keys:
+            self.entries.pop(key, None)
+        return len(expired_keys)
+
+
+class RedisPriceStore:
+    """Redis价格缓存 (SETEX设置过期时间，过期由Redis自动清理)
+
+    运行中Redis出错时不抛出异常: 读取视为未命中，写入直接跳过，并记录警告
+    """
+
+    KEY_PREFIX = 'price:'
+
+    def __init__(self, ttl_seconds: float, redis_url: str, logger=None):
+        import redis  # 可选依赖，只在使用Redis后端时才需要安装
+
+        self.ttl_seconds = max(1, int(ttl_seconds))
+        self.logger = logger
+        self.redis_error = redis.RedisError
+        self.redis = redis.Redis.from_url(redis_url, decode_responses=True)
+        self.redis.ping()
+
+    def _warn(self, action: str, e: Exception) -> None:
+        if self.logger:
+            self.logger.warning(f"Redis价格缓存{action}失败: {e}")
+
+    def get(self, symbol: str) -> Optional[Tuple[float, str]]:
+        """获取未过期的 (价格, 来源)"""
+        try:
+            value = self.redis.get(self.KEY_PREFIX + symbol)
+        except self.redis_error as e:
+            self._warn('读取', e)
+            return None
+        if value is None:
+            return None
+        data = orjson.loads(value)
+        return data['p'], data['s']
+
+    def set(self, symbol: str, price: float, source: str) -> None:
+        """写入价格"""
+        try:
+            self.redis.setex(self.KEY_PREFIX + symbol, self.ttl_seconds, orjson.dumps({'p': price, 's': source}))
+        except self.redis_error as e:
+            self._warn('写入', e)
+
+    def stats(self) -> Dict[str, int]:
+        """统计有效缓存数量"""
+        try:
+            keys = list(self.redis.scan_iter(match=self.KEY_PREFIX + '*'))
+            values = [value for value in (self.redis.mget(keys) if keys else []) if value is not None]
+        except self.redis_error as e:
+            self._warn('统计', e)
+            values = []
+        return {
+            'cached_tokens': len(values),
+            'dexscreener_sources': sum(1 for value in values if orjson.loads(value)['s'] == 'dexscreener')
+        }
+
+    def expiring(self, within_seconds: float) -> List[str]:
+        """仍然有效、但将在 within_seconds 秒内过期的代币"""
+        try:
+            keys = list(self.redis.scan_iter(match=self.KEY_PREFIX + '*'))
+            if not keys:
+                return []
+            pipeline = self.redis.pipeline()
+            for key in keys:
+                pipeline.pttl(key)
+            ttls = pipeline.execute()
+        except self.redis_error as e:
+            self._warn('查询过期时间', e)
+            return []
+        return [key[len(self.KEY_PREFIX):] for key, ttl_ms in zip(keys, ttls)
+                if 0 < ttl_ms <= within_seconds * 1000]
+
+    def clear_expired(self) -> int:
+        """Redis会自动删除过期键，这里无需处理"""
+        return 0
+
+
+def create_price_store(cache_config: Dict, logger=None):
+    """根据 price_cache 配置创建价格缓存
+
+    backend: memory (默认) 或 redis；redis 连接失败时退回内存缓存
+    max_entries: 内存缓存最多保存的代币数
+    """
+    ttl_seconds = cache_config.get('ttl_minutes', 5) * 60
+    backend = cache_config.get('backend', 'memory')
+
+    if backend == 'redis':
+        redis_url = cache_config.get('redis_url', 'redis://localhost:6379/0')
+        try:
+            return RedisPriceStore(ttl_seconds, redis_url, logger)
+        except Exception as e:
+            if logger:
+                logger.warning(f"Redis价格缓存不可用，改用内存缓存: {e}")
+
+    return MemoryPriceStore(ttl_seconds, cache_config.get('max_entries', 4096))